@@ -1,9 +1,17 @@
-from flask import Flask, request, jsonify
+import os
+import json
+import base64
+import time
+import datetime
+import functools
+import threading
+from flask import Flask, Response, request, jsonify, g, abort, stream_with_context
 from flask_cors import CORS  # Import CORS
 import psycopg2
 from psycopg2.extras import RealDictCursor
-import pgeocode
-import pandas as pd  # Make sure pandas is imported
+from db_pool import ConnectionPool, PoolTimeout
+from response_cache import ResponseCache
+from zip_centroids import geocode_zip_codes
 
 
 app = Flask(__name__)
@@ -15,39 +23,125 @@ DB_NAME = "fec_data"
 DB_USER = "postgres"
 DB_PASSWORD = "climbing"
 
-# Establish a database connection
+# Connection pool sizing, per process. With gunicorn, size DB_POOL_MAX to the
+# worker's thread count and keep workers * DB_POOL_MAX under max_connections.
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                                       host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD,
+                                       cursor_factory=RealDictCursor)
+    return _pool
+
+class DatabaseUnavailable(Exception):
+    pass
+
+# Check out a pooled connection for the current request; it is returned to the
+# pool when the request ends, so routes must not close it themselves
 def get_db_connection():
+    if 'db_conn' not in g:
+        try:
+            g.db_conn = get_pool().getconn()
+        except (psycopg2.Error, PoolTimeout) as e:
+            print(f"Error: Could not connect to the database: {e}")
+            raise DatabaseUnavailable(str(e))
+    return g.db_conn
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+@app.errorhandler(DatabaseUnavailable)
+def database_unavailable(error):
+    return jsonify({"error": "Database unavailable"}), 503
+
+@app.route('/metrics/pool', methods=['GET'])
+def pool_metrics():
+    if _pool is None:
+        return jsonify({"max_size": DB_POOL_MAX, "open": 0, "in_use": 0, "checkouts": 0})
+    return jsonify(_pool.stats())
+
+# Response cache. Keys include the data_version stamp the loader bumps, which
+# is re-read from the database at most every DATA_VERSION_CHECK_SECONDS. The
+# stamp pairs version with updated_at: a full reload recreates data_version and
+# restarts version, and updated_at keeps a reused number from matching old keys.
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1024)),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 128 * 1024 * 1024)),
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 300)),
+)
+DATA_VERSION_CHECK_SECONDS = float(os.environ.get("DATA_VERSION_CHECK_SECONDS", 5))
+
+_data_version = {'version': None, 'checked_at': 0.0}
+_data_version_lock = threading.Lock()
+
+def current_data_version():
+    with _data_version_lock:
+        if time.monotonic() - _data_version['checked_at'] < DATA_VERSION_CHECK_SECONDS:
+            return _data_version['version']
+    cursor = get_db_connection().cursor()
     try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD, cursor_factory=RealDictCursor)
-    except psycopg2.Error as e:
-        print(f"Error: Could not connect to the database: {e}")
-        return None
-    return conn
+        cursor.execute("SELECT version, updated_at FROM data_version")
+        row = cursor.fetchone()
+        version = (row['version'], row['updated_at'].isoformat()) if row else 0
+    except psycopg2.Error:
+        # Database predates data_version; don't let the failed statement poison the request
+        get_db_connection().rollback()
+        version = 0
+    finally:
+        cursor.close()
+    with _data_version_lock:
+        _data_version.update(version=version, checked_at=time.monotonic())
+    return version
+
+def cached_response(view):
+    """Serve a route's JSON body from response_cache, keyed by path, query args and data version."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), current_data_version())
+        body = response_cache.get(key)
+        if body is not None:
+            return Response(body, mimetype='application/json')
+        response = app.make_response(view(*args, **kwargs))
+        # Streamed responses are never buffered just to be cached
+        if response.status_code == 200 and not response.is_streamed:
+            response_cache.set(key, response.get_data())
+        return response
+    return wrapper
+
+@app.route('/metrics/cache', methods=['GET'])
+def cache_metrics():
+    return jsonify(response_cache.stats())
 
 @app.route('/committee-contributions', methods=['GET'])
+@cached_response
 def get_committee_contributions():
     conn = get_db_connection()
     cursor = conn.cursor()
+    # Precomputed by query_layer.py; refreshed by the loader after each load
     cursor.execute("""
-        SELECT
-            SUM(ccc.transaction_amt) AS transaction_total,
-            cm.cmte_nm AS committee_name,
-            cm.file_year,
-            cand.cand_name AS candidate_name
-        FROM committee_candidate_contributions ccc
-        JOIN committee_master cm ON cm.cmte_id = ccc.cmte_id AND cm.file_year = ccc.file_year
-        JOIN candidate_master cand ON cand.cand_id = ccc.cand_id AND cand.file_year = ccc.file_year
-        WHERE (ccc.transaction_tp = '24A' OR ccc.transaction_tp = '24N')
-        GROUP BY cm.file_year, ccc.cand_id, cand.cand_name, cm.cmte_nm
+        SELECT transaction_total, committee_name, file_year, candidate_name
+        FROM committee_candidate_totals
         ORDER BY transaction_total DESC
         LIMIT 100
     """)
     results = cursor.fetchall()
     cursor.close()
-    conn.close()
     return jsonify(results)
 
 @app.route('/candidates/names', methods=['GET'])
+@cached_response
 def get_candidate_names():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -58,11 +152,62 @@ def get_candidate_names():
     """)
     candidates = cursor.fetchall()
     cursor.close()
-    conn.close()
     return jsonify(candidates)
 
 
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+def trigram_search_available(cursor):
+    """Whether pg_trgm is installed; query_layer.py skips it if the server can't create it."""
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS installed")
+    return cursor.fetchone()['installed']
+
+@app.route('/candidates/search', methods=['GET'])
+@cached_response
+def search_candidates():
+    """
+    Ranked typeahead over candidate names, backed by the pg_trgm GIN index
+    from query_layer.py. Prefix matches rank first, then trigram word
+    similarity; each candidate appears once, with their latest cycle. Without
+    pg_trgm only names containing the query match, prefix matches first.
+    """
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int)
+    if limit < 1:
+        abort(400, description="limit must be a positive integer")
+    limit = min(limit, SEARCH_MAX_LIMIT)
+    if len(query) < 2:
+        return jsonify([])
+
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if trigram_search_available(cursor):
+        score = "(cand_name ILIKE %(prefix)s)::int + word_similarity(%(q)s, cand_name)"
+        match = "cand_name ILIKE %(contains)s OR %(q)s <%% cand_name"
+    else:
+        score = "(cand_name ILIKE %(prefix)s)::int"
+        match = "cand_name ILIKE %(contains)s"
+    cursor.execute("""
+        SELECT cand_id, cand_name, cand_pty_affiliation, cand_office, cand_office_st, file_year, score
+        FROM (
+            SELECT DISTINCT ON (cand_id)
+                cand_id, cand_name, cand_pty_affiliation, cand_office, cand_office_st, file_year,
+                {score} AS score
+            FROM candidate_master
+            WHERE {match}
+            ORDER BY cand_id, file_year DESC
+        ) matches
+        ORDER BY score DESC, cand_name
+        LIMIT %(limit)s
+    """.format(score=score, match=match), {'q': query, 'prefix': escaped + '%', 'contains': '%' + escaped + '%', 'limit': limit})
+    results = cursor.fetchall()
+    cursor.close()
+    return jsonify(results)
+
 @app.route('/individual-contributions/all', methods=['GET'])
+@cached_response
 def get_all_individual_contributions():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -87,129 +232,178 @@ def get_all_individual_contributions():
     """)
     results = cursor.fetchall()
     cursor.close()
-    conn.close()
     return jsonify(results)
 
 @app.route('/individual-contributions', methods=['GET'])
+@cached_response
 def get_individual_contributions():
     conn = get_db_connection()
     cursor = conn.cursor()
+    # Precomputed by query_layer.py; refreshed by the loader after each load
     cursor.execute("""
-        SELECT employer, file_year, COUNT(*) AS distinct_contributions
-        FROM individual_contributions ci
-        JOIN committee_master cm USING(cmte_id, file_year)
-        GROUP BY employer, file_year
+        SELECT employer, file_year, distinct_contributions
+        FROM employer_contribution_counts
         ORDER BY distinct_contributions DESC
         LIMIT 100
     """)
     results = cursor.fetchall()
     cursor.close()
-    conn.close()
     return jsonify(results)
 
+# Rows fetched per round trip when streaming contributions
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 5000))
+MAX_PAGE_SIZE = 10000
+
+CONTRIBUTIONS_BY_CANDIDATE_QUERY = """
+    WITH candidate_ids AS (
+        -- One row per candidate (their latest cycle), so contributions aren't repeated per cycle
+        SELECT DISTINCT ON (cand_id) cand_id, cand_name, cand_zip, candidate_latitude, candidate_longitude
+        FROM candidate_master
+        WHERE cand_name ILIKE %(name)s
+        ORDER BY cand_id, file_year DESC
+    ),
+    committee_ids AS (
+        SELECT DISTINCT ccl.cand_id, ccl.cmte_id
+        FROM candidate_committee_linkages ccl
+        JOIN candidate_ids ON candidate_ids.cand_id = ccl.cand_id
+    ),
+    candidate_transaction_sums AS (
+        SELECT 
+            committee_ids.cand_id,
+            SUM(ci.transaction_amt) AS total_candidate_amt
+        FROM individual_contributions ci
+        JOIN committee_ids ON ci.cmte_id = committee_ids.cmte_id
+        GROUP BY committee_ids.cand_id
+    )
+    SELECT 
+        ci.*,
+        cm.cand_id,
+        cm.cand_name, 
+        cm.cand_zip, 
+        cm.candidate_latitude, 
+        cm.candidate_longitude,
+        cts.total_candidate_amt,
+        ds.total_transaction_amt,
+        ds.average_periodicity,
+        ds.transaction_dates,
+        ds.transaction_amounts
+    FROM individual_contributions ci
+    JOIN committee_ids ON ci.cmte_id = committee_ids.cmte_id
+    JOIN candidate_ids cm ON committee_ids.cand_id = cm.cand_id
+    JOIN candidate_transaction_sums cts ON cm.cand_id = cts.cand_id
+    LEFT JOIN donor_summary ds ON ds.name = ci.name AND ds.zip_code = ci.zip_code
+    {keyset_filter}
+    ORDER BY COALESCE(ci.formatted_transaction_dt, '-infinity') DESC, ci.sub_id DESC, ci.file_year DESC,
+        cm.cand_id DESC
+    {limit}
+"""
+
+def add_coordinates(contributions):
+    # Attach candidate and donor coordinates from the shared ZIP centroid table
+    candidate_lats, candidate_lons = geocode_zip_codes([c['cand_zip'] for c in contributions])
+    donor_lats, donor_lons = geocode_zip_codes([c['zip_code'] for c in contributions])
+    for i, contribution in enumerate(contributions):
+        contribution['candidate_latitude'] = float(candidate_lats[i])
+        contribution['candidate_longitude'] = float(candidate_lons[i])
+        contribution['donor_latitude'] = float(donor_lats[i])
+        contribution['donor_longitude'] = float(donor_lons[i])
+
+def encode_page_cursor(contribution):
+    # The sort key of the page's last row; a contribution appears once per matching candidate
+    transaction_dt = contribution['formatted_transaction_dt']
+    key = [transaction_dt.isoformat() if transaction_dt else '-infinity', contribution['sub_id'],
+           contribution['file_year'], contribution['cand_id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_page_cursor(token):
+    """Return the cursor's key as a dict of the page query's cursor_* parameters."""
+    try:
+        transaction_dt, sub_id, file_year, cand_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        if transaction_dt != '-infinity':
+            datetime.date.fromisoformat(transaction_dt)
+        sub_id, file_year, cand_id = str(sub_id), int(file_year), str(cand_id)
+    except (ValueError, TypeError):
+        abort(400, description="Invalid cursor")
+    return {'cursor_dt': transaction_dt, 'cursor_sub_id': sub_id, 'cursor_file_year': file_year,
+            'cursor_cand_id': cand_id}
+
+def stream_contribution_batches(conn, params):
+    """Yield contributions in batches from a server-side cursor, so memory stays flat."""
+    cursor = conn.cursor(name='contributions_by_candidate')
+    cursor.itersize = STREAM_BATCH_SIZE
+    cursor.execute(CONTRIBUTIONS_BY_CANDIDATE_QUERY.format(keyset_filter='', limit=''), params)
+    try:
+        while True:
+            batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not batch:
+                break
+            add_coordinates(batch)
+            yield batch
+    finally:
+        cursor.close()
+
 @app.route('/contributions/by-candidate', methods=['GET'])
+@cached_response
 def contributions_by_candidate():
+    """
+    Contributions to committees linked to candidates matching ?name=.
+
+    By default the full result is streamed as a JSON array (or as NDJSON with
+    ?format=ndjson) from a server-side cursor. With ?limit=N a single page is
+    returned instead, along with a next_cursor token to pass back as ?cursor=
+    for the following page.
+    """
     candidate_name = request.args.get('name')  # Get candidate name from URL parameter
+    if not candidate_name:
+        abort(400, description="Missing required parameter: name")
+    params = {'name': '%' + candidate_name + '%'}
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Execute the query with case-insensitive search for candidate name
-    
-    cursor.execute("""
-        WITH candidate_ids AS (
-            SELECT cand_id, cand_name, cand_zip, candidate_latitude, candidate_longitude
-            FROM candidate_master
-            WHERE cand_name ILIKE %s
-        ),
-        committee_ids AS (
-            SELECT ccl.cand_id, ccl.cmte_id
-            FROM candidate_committee_linkages ccl
-            JOIN candidate_ids ON candidate_ids.cand_id = ccl.cand_id
-        ),
-        candidate_transaction_sums AS (
-            SELECT 
-                committee_ids.cand_id,
-                SUM(ci.transaction_amt) AS total_candidate_amt
-            FROM individual_contributions ci
-            JOIN committee_ids ON ci.cmte_id = committee_ids.cmte_id
-            GROUP BY committee_ids.cand_id
-        )
-        SELECT 
-            ci.*,
-            cm.cand_name, 
-            cm.cand_zip, 
-            cm.candidate_latitude, 
-            cm.candidate_longitude,
-            cts.total_candidate_amt
-        FROM individual_contributions ci
-        JOIN committee_ids ON ci.cmte_id = committee_ids.cmte_id
-        JOIN candidate_ids cm ON committee_ids.cand_id = cm.cand_id
-        JOIN candidate_transaction_sums cts ON cm.cand_id = cts.cand_id
-        ORDER BY ci.transaction_dt DESC;
-    """, ('%' + candidate_name + '%',))
 
+    if 'limit' in request.args:
+        return contributions_by_candidate_page(conn, params)
+
+    batches = stream_contribution_batches(conn, params)
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for batch in batches:
+                yield ''.join(app.json.dumps(contribution) + '\n' for contribution in batch)
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    def generate():
+        yield '['
+        separator = ''
+        for batch in batches:
+            yield separator + ','.join(app.json.dumps(contribution) for contribution in batch)
+            separator = ','
+        yield ']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def contributions_by_candidate_page(conn, params):
+    """
+    Keyset-paginated variant: one page ordered by (formatted_transaction_dt,
+    sub_id, file_year, cand_id) descending, which is unique per result row.
+    """
+    limit = request.args.get('limit', type=int)
+    if not limit or limit < 1:
+        abort(400, description="limit must be a positive integer")
+    params['limit'] = min(limit, MAX_PAGE_SIZE)
+
+    keyset_filter = ''
+    if request.args.get('cursor'):
+        params.update(decode_page_cursor(request.args['cursor']))
+        keyset_filter = """
+            WHERE (COALESCE(ci.formatted_transaction_dt, '-infinity'), ci.sub_id, ci.file_year, cm.cand_id)
+                < (%(cursor_dt)s::date, %(cursor_sub_id)s, %(cursor_file_year)s, %(cursor_cand_id)s)
+        """
+
+    cursor = conn.cursor()
+    cursor.execute(CONTRIBUTIONS_BY_CANDIDATE_QUERY.format(keyset_filter=keyset_filter, limit='LIMIT %(limit)s'), params)
     contributions = cursor.fetchall()
-    
-    # Close the cursor and connection
     cursor.close()
-    conn.close()
-
-    # Initialize pgeocode for the United States
-    # nomi = pgeocode.Nominatim('us')
-    
-    # enhanced_contributions = []
-    # Initialize caches for candidate and donor locations
-    # candidate_locations_cache = {}
-    # doner_locations_cache = {}
-
-    # for contribution in contributions:
-    #     # Get zip codes from your data
-    #     doner_zipcode = contribution['zip_code'][0:5]
-    #     candidate_zipcode = contribution['cand_zip'][0:5]
-
-    #     # Check cache for candidate location
-    #     if candidate_zipcode in candidate_locations_cache:
-    #         candidate_location = candidate_locations_cache[candidate_zipcode]
-    #     else:
-    #         # If not in cache, query and update cache
-    #         candidate_location = nomi.query_postal_code(candidate_zipcode)
-    #         candidate_locations_cache[candidate_zipcode] = candidate_location
-
-    #     # Check cache for donor location
-    #     if doner_zipcode in doner_locations_cache:
-    #         doner_location = doner_locations_cache[doner_zipcode]
-    #     else:
-    #         # If not in cache, query and update cache
-    #         doner_location = nomi.query_postal_code(doner_zipcode)
-    #         doner_locations_cache[doner_zipcode] = doner_location
-
-        # Process locations
-        # Assuming `candidate_location` and `doner_location` are Series objects returned from `pgeocode`
-        # if candidate_location is not None and not candidate_location.empty:
-        #     # Check if latitude or longitude are NaN. Adjust field names if necessary.
-        #     if pd.notna(candidate_location.latitude) and pd.notna(candidate_location.longitude):
-        #         candidate_lat, candidate_lon = candidate_location.latitude, candidate_location.longitude
-        #     else:
-        #         candidate_lat, candidate_lon = 0.0, 0.0
-
-        # if doner_location is not None and not doner_location.empty:
-        #     # Same check for donor location
-        #     if pd.notna(doner_location.latitude) and pd.notna(doner_location.longitude):
-        #         doner_lat, doner_lon = doner_location.latitude, doner_location.longitude
-        #     else:
-        #         doner_lat, doner_lon = 0.0, 0.0
-
-        # Add lat/lon to the contribution data
-        # contribution['candidate_latitude'] = candidate_lat
-        # contribution['candidate_longitude'] = candidate_lon
-        # contribution['doner_latitude'] = doner_lat
-        # contribution['doner_longitude'] = doner_lon
-
-        # enhanced_contributions.append(contribution)
-        # print(contribution)
-
-    print(candidate_name, contributions)
-    return jsonify(contributions)
+
+    add_coordinates(contributions)
+    next_cursor = encode_page_cursor(contributions[-1]) if len(contributions) == params['limit'] else None
+    return jsonify({'contributions': contributions, 'next_cursor': next_cursor})
 
 if __name__ == '__main__':
     app.run(debug=True)
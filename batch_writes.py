@@ -0,0 +1,150 @@
+"""
+Batched writes for the postprocessing steps.
+
+BatchWriter buffers rows produced in Python and writes them a page at a time
+(e.g. one COPY per page) instead of one statement per row.
+batched_update runs a set-based UPDATE over key ranges of a table. Both can
+commit every N rows and print progress with a running rate as they go.
+"""
+import csv
+import io
+import time
+
+class BatchWriter:
+    """
+    Collect rows and hand them to write_page(cur, rows) page_size at a time.
+
+    Parameters:
+    - conn: A connection object to the PostgreSQL database.
+    - write_page: Function writing one page of rows, e.g. from copy_page_writer.
+    - page_size: Rows per page.
+    - commit_interval: Commit after roughly this many rows (rounded up to whole
+      pages). None leaves committing to the caller, e.g. when the rows go to a
+      temp table that is dropped on commit.
+    - progress_interval: Print progress after roughly this many rows; None is quiet.
+    - label: Name used in progress messages.
+    """
+
+    def __init__(self, conn, write_page, page_size=10000, commit_interval=None, progress_interval=None,
+                 label='rows'):
+        self.conn = conn
+        self.write_page = write_page
+        self.page_size = page_size
+        self.commit_interval = commit_interval
+        self.progress_interval = progress_interval
+        self.label = label
+        self.count = 0
+        self._page = []
+        self._cur = conn.cursor()
+        self._uncommitted = 0
+        self._unreported = 0
+        self._start = time.perf_counter()
+
+    def add(self, row):
+        self._page.append(row)
+        if len(self._page) >= self.page_size:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        """Write the buffered rows, committing and reporting progress when due."""
+        if not self._page:
+            return
+        self.write_page(self._cur, self._page)
+        written = len(self._page)
+        self._page = []
+        self.count += written
+        self._uncommitted += written
+        self._unreported += written
+        if self.commit_interval and self._uncommitted >= self.commit_interval:
+            self.conn.commit()
+            self._uncommitted = 0
+        if self.progress_interval and self._unreported >= self.progress_interval:
+            report_progress(self.label, self.count, self._start)
+            self._unreported = 0
+
+    def close(self):
+        """Write what is left, commit if a commit interval is set, and return the row count."""
+        self.flush()
+        if self.commit_interval:
+            self.conn.commit()
+        self._cur.close()
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._cur.close()
+
+def copy_page_writer(table_name, columns):
+    """write_page function that COPYs each page into table_name as CSV."""
+    statement = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV)"
+
+    def write_page(cur, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        buffer.seek(0)
+        cur.copy_expert(statement, buffer)
+    return write_page
+
+def batched_update(conn, table_name, key_column, statement, params=None, where='TRUE', batch_size=100000,
+                   commit_interval=None, progress_interval=None, label=None):
+    """
+    Run an UPDATE over table_name in ranges of batch_size rows, walking
+    key_column in order (it should be indexed).
+
+    where selects the rows to update. statement must contain {key_range},
+    which is replaced by where plus a condition selecting the current range.
+    Both may use %(name)s placeholders from params. Committing every
+    commit_interval rows keeps transactions and locks short; None leaves
+    committing to the caller. Returns the number of rows updated.
+    """
+    params = dict(params or {})
+    label = label or table_name
+    cur = conn.cursor()
+    start = time.perf_counter()
+    lower = ''
+    updated = scanned = uncommitted = unreported = 0
+    while True:
+        cur.execute(f"""
+            SELECT max({key_column}), count(*) FROM (
+                SELECT {key_column} FROM {table_name}
+                WHERE {where} {lower}
+                ORDER BY {key_column}
+                LIMIT {int(batch_size)}
+            ) batch
+        """, params)
+        params['batch_upper'], batch_rows = cur.fetchone()
+        if not batch_rows:
+            break
+
+        cur.execute(statement.format(key_range=f"({where}) AND {key_column} <= %(batch_upper)s {lower}"), params)
+        updated += cur.rowcount
+        scanned += batch_rows
+        uncommitted += batch_rows
+        unreported += batch_rows
+        params['batch_lower'] = params['batch_upper']
+        lower = f"AND {key_column} > %(batch_lower)s"
+
+        if commit_interval and uncommitted >= commit_interval:
+            conn.commit()
+            uncommitted = 0
+        if progress_interval and unreported >= progress_interval:
+            report_progress(label, scanned, start)
+            unreported = 0
+
+    if commit_interval:
+        conn.commit()
+    cur.close()
+    return updated
+
+def report_progress(label, count, start):
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {count} rows in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f} rows/s)")
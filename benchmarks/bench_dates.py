@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: vectorized fec_dates vs. the old row-at-a-time date helpers.
+
+The legacy functions are reproduced here (minus their per-call prints) since
+they no longer exist in preprocess_data / postprocess_data.
+
+    python benchmarks/bench_dates.py [rows]
+"""
+import os
+import sys
+import time
+import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fec_dates import parse_fec_dates, format_fec_dates
+
+
+def legacy_normalize_date(date_str):
+    if pd.isnull(date_str) or len(str(date_str)) < 7:
+        return '2024-01-01'
+    date_str = str(int(float(date_str)))
+    year = date_str[-4:]
+    if len(date_str) == 7:
+        month = date_str[:-6]
+        day = date_str[1:3]
+    elif len(date_str) == 8:
+        month = date_str[:-6]
+        day = date_str[2:4]
+    else:
+        return '2024-01-01'
+    if len(month) < 2:
+        month = '0' + month
+    return f'{year}-{month}-{day}'
+
+
+def legacy_convert_date_format(date_float_str):
+    if not date_float_str or date_float_str.lower() == 'null':
+        return None
+    date_str = str(int(float(date_float_str))).zfill(7)
+    if len(date_str) == 7:
+        date_str = '0' + date_str
+    date_obj = datetime.datetime.strptime(date_str, '%m%d%Y')
+    return date_obj.strftime('%Y-%m-%d')
+
+
+def sample_dates(rows, seed=0):
+    """FEC-shaped sample: mostly MMDDYYYY text, some float-mangled, some missing."""
+    rng = np.random.default_rng(seed)
+    days = pd.to_datetime('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D')
+    dates = pd.Series(days.strftime('%m%d%Y'), dtype=object)
+    mangled = rng.random(rows) < 0.3
+    dates[mangled] = dates[mangled].map(lambda d: f'{int(d)}.0')
+    dates[rng.random(rows) < 0.02] = None
+    return dates
+
+
+def timed(label, func, rows):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f}s  {rows / elapsed:14,.0f} rows/s")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dates = sample_dates(rows)
+    text_dates = dates.fillna('NULL').astype(str)
+    print(f"{rows:,} dates")
+
+    legacy = timed("legacy normalize_date (apply)", lambda: dates.apply(legacy_normalize_date), rows)
+    timed("parse_fec_dates", lambda: parse_fec_dates(dates), rows)
+    print()
+    legacy_db = timed("legacy convert_date_format (loop)", lambda: [legacy_convert_date_format(d) for d in text_dates], rows)
+    vectorized = timed("format_fec_dates", lambda: format_fec_dates(text_dates), rows)
+    print(f"\nformat_fec_dates speedup over convert_date_format: {legacy_db / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark: preprocessing, loading, postprocessing, query layer
+refresh, grid import and the backend endpoints, timed at several scales on
+synthetic FEC-shaped data (benchmarks/synthetic_fec.py).
+
+Runs against a scratch database on the local Postgres (created if missing and
+rebuilt at every scale); connection settings other than the database name
+come from the usual PG* environment variables. A stage that fails is
+recorded with its error and the run moves on.
+
+    python benchmarks/bench_pipeline.py [--scales 10000 100000] [--output results.json]
+        [--baseline previous.json] [--db-name fec_bench] [--keep-data DIR]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import traceback
+import psycopg2
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import load_fec
+import postprocess_data
+import query_layer
+from grid_import import import_grid
+from synthetic_fec import generate, TABLES
+
+YEAR = 2024
+
+# (label, path) requested from the backend, each with a cold response cache
+ENDPOINTS = [
+    ('committee-contributions', '/committee-contributions'),
+    ('individual-contributions', '/individual-contributions'),
+    ('individual-contributions-all', '/individual-contributions/all'),
+    ('candidates-names', '/candidates/names'),
+    ('candidates-search', '/candidates/search?q=candidate1'),
+    ('by-candidate-page', '/contributions/by-candidate?name=CANDIDATE1,&limit=500'),
+    ('by-candidate-stream', '/contributions/by-candidate?name=CANDIDATE1,'),
+]
+
+class Recorder:
+    """Collects one result per timed stage."""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.results = []
+
+    def run(self, stage, fn, *args, table=None, rows=None, **kwargs):
+        """Time fn(*args, **kwargs); rows may be a number or a function of fn's return value."""
+        result = {'scale': self.scale, 'stage': stage, 'table': table}
+        start = time.perf_counter()
+        try:
+            value = fn(*args, **kwargs)
+        except Exception as error:
+            value = None
+            result['error'] = f"{type(error).__name__}: {error}"
+            traceback.print_exc()
+        seconds = time.perf_counter() - start
+        if callable(rows):
+            rows = rows(value) if 'error' not in result else None
+        result.update(seconds=round(seconds, 4), rows=rows,
+                      rows_per_second=round(rows / seconds) if rows and seconds else None)
+        self.results.append(result)
+        label = f"{stage}{'/' + table if table else ''}"
+        status = result.get('error') or (f"{result['rows_per_second']} rows/s" if rows else '')
+        print(f"[{self.scale}] {label:<50} {seconds:8.3f}s  {status}")
+        return value
+
+def ensure_database(db_name):
+    conn = psycopg2.connect(dbname='postgres', user=load_fec.DB_USER, password=load_fec.DB_PASSWORD)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
+    if cur.fetchone() is None:
+        cur.execute(f"CREATE DATABASE {db_name}")
+    cur.close()
+    conn.close()
+
+def with_connection(fn, *args, **kwargs):
+    conn = load_fec.connect()
+    try:
+        return fn(conn, *args, **kwargs)
+    finally:
+        conn.close()
+
+def rebuild_grid_tables(conn):
+    for table_name in ('committee_grid', 'candidate_grid'):
+        postprocess_data.drop_table(conn, table_name)
+    postprocess_data.create_committee_grid_table(conn)
+    postprocess_data.create_candidate_grid_table(conn)
+
+def request_endpoint(client, path, repeat):
+    """Request path repeat times with the response cache cleared; returns the last body size."""
+    import backend
+    size = 0
+    for _ in range(repeat):
+        backend.response_cache.clear()
+        response = client.get(path)
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+            size = len(response.get_data())
+        finally:
+            # Closing a streamed response ends its request and returns the pooled connection
+            response.close()
+    return size
+
+def run_scale(scale, data_directory, args):
+    recorder = Recorder(scale)
+    load_fec.DATA_DIRECTORY = data_directory
+    counts = recorder.run('generate', generate, data_directory, scale, YEAR, args.zip_cardinality,
+                          args.donor_repeat, args.seed, rows=lambda counts: sum(counts.values()))
+    if counts is None:
+        return recorder.results
+
+    for table_name in TABLES:
+        recorder.run('preprocess', load_fec.preprocess_dataset, table_name, YEAR, args.chunksize, args.engine,
+                     args.copy_format, table=table_name, rows=counts[table_name])
+
+    recorder.run('create', with_connection, load_fec.create_tables, drop=True)
+    for table_name in TABLES:
+        recorder.run('load', load_fec.load_dataset, table_name, YEAR, table=table_name, rows=counts[table_name])
+
+    contributions = counts['individual_contributions']
+    recorder.run('postprocess', with_connection, postprocess_data.update_formatted_transaction_dt, force=True,
+                 table='formatted_transaction_dt', rows=contributions)
+    recorder.run('postprocess', with_connection, postprocess_data.build_donor_summary,
+                 table='donor_summary', rows=contributions)
+    recorder.run('postprocess', with_connection, postprocess_data.set_committee_totals,
+                 table='committee_totals', rows=counts['committee_transactions'])
+    recorder.run('refresh', with_connection, query_layer.refresh_query_layer)
+    recorder.run('refresh', with_connection, query_layer.bump_data_version, table='data_version')
+
+    recorder.run('create', with_connection, rebuild_grid_tables, table='grids')
+    for table_name in ('committee_grid', 'candidate_grid'):
+        recorder.run('grid_import', with_connection, import_grid, table_name,
+                     os.path.join(data_directory, f"{table_name}.zip"), table=table_name, rows=lambda rows: rows)
+
+    import backend
+    backend.DB_NAME = args.db_name
+    backend.DB_HOST = os.environ.get('PGHOST', backend.DB_HOST)
+    client = backend.app.test_client()
+    for label, path in ENDPOINTS:
+        recorder.run('endpoint', request_endpoint, client, path, args.requests, table=label, rows=args.requests)
+    # Don't leave pooled connections open on tables the next scale drops
+    if backend._pool is not None:
+        backend._pool.closeall()
+        backend._pool = None
+    return recorder.results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIRECTORY, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def server_version():
+    try:
+        return with_connection(lambda conn: conn.server_version)
+    except psycopg2.Error:
+        return None
+
+def compare(results, baseline_path):
+    """Print each stage's time relative to the same stage in a previous run."""
+    with open(baseline_path) as f:
+        baseline = {(r['scale'], r['stage'], r['table']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path} (ratio > 1 is slower):")
+    for result in results:
+        previous = baseline.get((result['scale'], result['stage'], result['table']))
+        if previous is None or 'error' in result or 'error' in previous or not previous['seconds']:
+            continue
+        label = f"{result['stage']}{'/' + result['table'] if result['table'] else ''}"
+        print(f"[{result['scale']}] {label:<50} {previous['seconds']:8.3f}s -> {result['seconds']:8.3f}s  "
+              f"x{result['seconds'] / previous['seconds']:.2f}")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the load pipeline on synthetic FEC data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000],
+                        help="individual_contributions rows per run; other tables scale with it")
+    parser.add_argument("--db-name", default="fec_bench", help="Scratch database, dropped and rebuilt per scale")
+    parser.add_argument("--zip-cardinality", type=int, default=20000)
+    parser.add_argument("--donor-repeat", type=float, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=None, help="Preprocess in chunks of this many rows")
+    parser.add_argument("--engine", choices=load_fec.ENGINES, default="pandas", help="CSV engine for preprocessing")
+    parser.add_argument("--copy-format", choices=load_fec.OUTPUT_FORMATS, default="csv",
+                        help="Preprocess into text or binary COPY data")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per endpoint")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--keep-data", help="Generate files under this directory and keep them")
+    args = parser.parse_args()
+
+    if args.db_name == "fec_data":
+        parser.error("refusing to benchmark against the fec_data database; its tables are dropped")
+    load_fec.DB_NAME = args.db_name
+    ensure_database(args.db_name)
+
+    results = []
+    for scale in args.scales:
+        if args.keep_data:
+            data_directory = os.path.join(args.keep_data, str(scale))
+            results.extend(run_scale(scale, data_directory, args))
+        else:
+            data_directory = tempfile.mkdtemp(prefix=f"fec_bench_{scale}_")
+            try:
+                results.extend(run_scale(scale, data_directory, args))
+            finally:
+                shutil.rmtree(data_directory, ignore_errors=True)
+
+    report = {
+        'metadata': {
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'postgres_server_version': server_version(),
+            'parameters': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Check that binary COPY output loads exactly the rows the text output does.
+
+Each raw file of a cycle is preprocessed both ways, both results are copied
+into temporary copies of its table on a scratch database, and the two are
+compared with EXCEPT ALL in each direction. Raw files are read from
+DATA_DIR/<year>/ (the layout load_fec.py downloads into) or generated with
+benchmarks/synthetic_fec.py. Exits with status 1 if any table differs.
+
+    python benchmarks/check_copy_formats.py [--data-dir DIR] [--rows 10000] [--year 2024]
+        [--db-name fec_bench] [--chunksize N] [--engine pandas]
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import load_fec
+import pg_binary_copy
+from preprocess_data import preprocess_file
+from synthetic_fec import generate, TABLES
+from bench_pipeline import ensure_database
+
+# Differing rows printed per table and direction
+SAMPLE_ROWS = 3
+
+def copy_file(cur, table_name, path):
+    """COPY a preprocessed file into table_name, the way load_fec.load_dataset reads it."""
+    with open(path, 'rb') as f:
+        binary = pg_binary_copy.is_binary(f.read(len(pg_binary_copy.SIGNATURE)))
+        f.seek(0)
+        if binary:
+            columns = ', '.join(pg_binary_copy.read_header(f))
+        else:
+            columns = f.readline().decode('utf-8').rstrip('\r\n').replace('|', ', ')
+        f.seek(0)
+        cur.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH ({load_fec.copy_options(binary=binary)})", f)
+
+def compare_table(conn, table_name, raw_path, year, output_directory, chunksize=None, engine='pandas'):
+    """Preprocess raw_path as text and as binary, load both and return the number of differing rows."""
+    paths = {}
+    for output_format in load_fec.OUTPUT_FORMATS:
+        paths[output_format] = os.path.join(output_directory, f"{table_name}.{output_format}")
+        preprocess_file(raw_path, load_fec.sql_file_path(table_name), year, f"{table_name}.txt",
+                        chunksize=chunksize, output_path=paths[output_format], engine=engine,
+                        output_format=output_format)
+
+    cur = conn.cursor()
+    for output_format, path in paths.items():
+        cur.execute(f"CREATE TEMP TABLE {output_format}_rows (LIKE {table_name}) ON COMMIT DROP")
+        copy_file(cur, f"{output_format}_rows", path)
+    cur.execute("SELECT count(*) FROM csv_rows")
+    rows = cur.fetchone()[0]
+
+    differences = 0
+    for left, right in (('csv', 'binary'), ('binary', 'csv')):
+        cur.execute(f"SELECT * FROM {left}_rows EXCEPT ALL SELECT * FROM {right}_rows")
+        missing = cur.fetchall()
+        differences += len(missing)
+        for row in missing[:SAMPLE_ROWS]:
+            print(f"  only in {left}: {row}")
+    print(f"{table_name}: {rows} rows, {differences} differing")
+    conn.rollback()
+    cur.close()
+    return differences
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare the rows loaded from text and binary COPY output.")
+    parser.add_argument("--data-dir", help="Directory with raw files under <year>/; synthetic data if omitted")
+    parser.add_argument("--rows", type=int, default=10000, help="individual_contributions rows of synthetic data")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--db-name", default="fec_bench", help="Scratch database; its tables are recreated")
+    parser.add_argument("--chunksize", type=int, default=None, help="Preprocess in chunks of this many rows")
+    parser.add_argument("--engine", choices=load_fec.ENGINES, default="pandas", help="CSV engine for preprocessing")
+    args = parser.parse_args()
+
+    if args.db_name == "fec_data":
+        parser.error("refusing to check against the fec_data database; its tables are dropped")
+    load_fec.DB_NAME = args.db_name
+    ensure_database(args.db_name)
+
+    work_directory = tempfile.mkdtemp(prefix="fec_copy_formats_")
+    try:
+        data_directory = args.data_dir
+        if data_directory is None:
+            data_directory = os.path.join(work_directory, 'raw')
+            generate(data_directory, args.rows, args.year)
+        conn = load_fec.connect()
+        try:
+            load_fec.create_tables(conn, drop=True)
+            differences = 0
+            for table_name in TABLES:
+                raw_path = os.path.join(data_directory, str(args.year), f"{table_name}.txt")
+                if not os.path.exists(raw_path):
+                    print(f"{table_name}: no raw file, skipped")
+                    continue
+                differences += compare_table(conn, table_name, raw_path, args.year, work_directory,
+                                             args.chunksize, args.engine)
+        finally:
+            conn.close()
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+    sys.exit(1 if differences else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Check that the pandas and arrow engines preprocess files byte for byte the same.
+
+Each raw file of a cycle is preprocessed to text by both engines, in memory
+and in chunks, and the outputs are compared. Raw files are read from
+DATA_DIR/<year>/ (the layout load_fec.py downloads into) or generated with
+benchmarks/synthetic_fec.py. Exits with status 1 if any output differs.
+
+    python benchmarks/check_engines.py [--data-dir DIR] [--rows 10000] [--year 2024] [--chunksize 5000]
+"""
+import os
+import sys
+import shutil
+import filecmp
+import tempfile
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import load_fec
+from preprocess_data import preprocess_file, ENGINES
+from synthetic_fec import generate, TABLES
+
+def first_difference(path, other_path):
+    """The first pair of differing lines of two files, or None if only their lengths differ."""
+    with open(path, 'rb') as f, open(other_path, 'rb') as other:
+        for line, other_line in zip(f, other):
+            if line != other_line:
+                return line.rstrip(b'\n').decode('utf-8', 'replace'), other_line.rstrip(b'\n').decode('utf-8', 'replace')
+    return None
+
+def compare_table(table_name, raw_path, year, output_directory, chunksize=None):
+    """Preprocess raw_path with every engine and return True if the outputs are identical."""
+    paths = []
+    for engine in ENGINES:
+        path = os.path.join(output_directory, f"{table_name}.{engine}")
+        preprocess_file(raw_path, load_fec.sql_file_path(table_name), year, f"{table_name}.txt",
+                        chunksize=chunksize, output_path=path, engine=engine)
+        paths.append(path)
+    identical = all(filecmp.cmp(paths[0], path, shallow=False) for path in paths[1:])
+    print(f"{table_name} ({'chunks of ' + str(chunksize) if chunksize else 'in memory'}): "
+          f"{'identical' if identical else 'DIFFERENT'}")
+    if not identical:
+        for engine, path in zip(ENGINES[1:], paths[1:]):
+            difference = first_difference(paths[0], path)
+            if difference:
+                print(f"  {ENGINES[0]}: {difference[0]}\n  {engine}: {difference[1]}")
+    return identical
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare the preprocessing output of the CSV engines.")
+    parser.add_argument("--data-dir", help="Directory with raw files under <year>/; synthetic data if omitted")
+    parser.add_argument("--rows", type=int, default=10000, help="individual_contributions rows of synthetic data")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--chunksize", type=int, default=5000, help="Also compare chunked preprocessing")
+    args = parser.parse_args()
+
+    work_directory = tempfile.mkdtemp(prefix="fec_engines_")
+    try:
+        data_directory = args.data_dir
+        if data_directory is None:
+            data_directory = os.path.join(work_directory, 'raw')
+            generate(data_directory, args.rows, args.year)
+        differing = 0
+        for table_name in TABLES:
+            raw_path = os.path.join(data_directory, str(args.year), f"{table_name}.txt")
+            if not os.path.exists(raw_path):
+                print(f"{table_name}: no raw file, skipped")
+                continue
+            for chunksize in (None, args.chunksize):
+                differing += not compare_table(table_name, raw_path, args.year, work_directory, chunksize)
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+    sys.exit(1 if differing else 0)
+
+if __name__ == "__main__":
+    main()
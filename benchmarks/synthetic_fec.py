@@ -0,0 +1,216 @@
+"""
+Synthetic FEC-shaped bulk files for benchmarks.
+
+Writes raw pipe-delimited files, in the layout the FEC publishes them (the
+columns of each sql/*.sql table up to, but not including, the columns the
+preprocessing step derives), plus summary grid ZIPs. Identifiers are drawn
+from shared pools so the files join the way the real ones do, and donors
+repeat across contributions with a fixed ZIP code each.
+
+    python benchmarks/synthetic_fec.py OUTPUT_DIR [--rows N] [--year 2024]
+        [--zip-cardinality N] [--donor-repeat N] [--seed N]
+"""
+import os
+import sys
+import zipfile
+import numpy as np
+import pandas as pd
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+from preprocess_data import extract_columns_from_sql, FLOAT_FORMAT
+from grid_import import GRIDS
+
+SQL_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'sql')
+
+# Rows per transaction dataset, as a fraction of the individual_contributions row count
+TABLE_SCALES = {
+    'individual_contributions': 1.0,
+    'committee_transactions': 0.5,
+    'operating_expenditures': 0.25,
+    'committee_candidate_contributions': 0.1,
+}
+
+# Datasets with one row per committee or candidate: table -> (pool, key column)
+ENTITY_TABLES = {
+    'committee_master': ('committees', 'cmte_id'),
+    'pac_summary': ('committees', 'cmte_id'),
+    'candidate_master': ('candidates', 'cand_id'),
+    'candidate_committee_linkages': ('candidates', 'cand_id'),
+    'house_senate_current_campaigns': ('candidates', 'cand_id'),
+}
+
+TABLES = list(TABLE_SCALES) + list(ENTITY_TABLES)
+
+# Contribution rows per committee and per candidate, and per grid record
+ROWS_PER_COMMITTEE = 1000
+ROWS_PER_CANDIDATE = 2000
+ROWS_PER_GRID_RECORD = {'committee_grid': 20, 'candidate_grid': 40}
+
+STATES = np.array(['CA', 'TX', 'NY', 'FL', 'VA', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI', 'WA', 'MA', 'AZ', 'CO', 'DC'])
+TRANSACTION_TYPES = np.array(['15', '15E', '15C', '22Y', '24A', '24E', '24K', '24N', '10', '11'])
+ENTITY_TYPES = np.array(['IND', 'ORG', 'COM', 'PAC', 'CAN', 'CCM', 'PTY'])
+OFFICES = np.array(['H', 'S', 'P'])
+
+# Columns added by preprocess_data rather than read from the FEC file
+DERIVED_COLUMNS = {'formatted_transaction_dt', 'file_year', 'candidate_latitude', 'candidate_longitude',
+                   'donor_latitude', 'donor_longitude'}
+
+def raw_columns(table_name):
+    """(name, type) pairs of the columns an FEC file for table_name carries."""
+    columns = []
+    for name, sql_type in extract_columns_from_sql(os.path.join(SQL_DIRECTORY, f"{table_name}.sql")):
+        if name in DERIVED_COLUMNS:
+            break
+        columns.append((name, sql_type))
+    return columns
+
+class Pools:
+    """Shared identifier pools, sized from the contribution row count."""
+
+    def __init__(self, rows, zip_cardinality, donor_repeat, rng):
+        self.rng = rng
+        self.committees = np.array([f'C{i:08d}' for i in range(max(10, rows // ROWS_PER_COMMITTEE))])
+        candidate_count = max(5, rows // ROWS_PER_CANDIDATE)
+        self.candidates = np.array([f'{OFFICES[i % 3]}{i:08d}' for i in range(candidate_count)])
+        self.candidate_names = np.array([f'CANDIDATE{i}, PAT' for i in range(candidate_count)])
+        zips = rng.integers(1001, 99950, zip_cardinality)
+        plus_four = rng.random(zip_cardinality) < 0.3
+        self.zips = np.where(plus_four, [f'{z:05d}{p:04d}' for z, p in zip(zips, rng.integers(0, 9999, zip_cardinality))],
+                             [f'{z:05d}' for z in zips])
+        self.donor_count = max(1, int(rows / max(donor_repeat, 1)))
+        self.employers = np.array([f'EMPLOYER {i}' for i in range(500)] + ['RETIRED', 'SELF-EMPLOYED', 'NONE'])
+        self.occupations = np.array([f'OCCUPATION {i}' for i in range(200)] + ['RETIRED', 'NOT EMPLOYED'])
+
+    def pick(self, values, rows):
+        return values[self.rng.integers(0, len(values), rows)]
+
+def column_values(table_name, name, sql_type, rows, year, pools, donors, sub_id_base):
+    """Values for one column; donors is the donor index of each row (or None)."""
+    rng = pools.rng
+    if table_name in ENTITY_TABLES and name == ENTITY_TABLES[table_name][1]:
+        # One row per committee/candidate, so the primary keys stay unique
+        return getattr(pools, ENTITY_TABLES[table_name][0])[:rows]
+    if name == 'cmte_id' or name == 'cand_pcc' or (name == 'other_id' and table_name != 'committee_candidate_contributions'):
+        return pools.pick(pools.committees, rows)
+    if name in ('cand_id', 'other_id'):
+        return pools.pick(pools.candidates, rows)
+    if name == 'cand_name':
+        return pools.pick(pools.candidate_names, rows)
+    if name == 'name':
+        if donors is not None:
+            return np.char.add(np.char.add('DONOR', donors.astype(str)), ', ALEX')
+        return np.char.add('PAYEE ', rng.integers(0, 5000, rows).astype(str))
+    if name.endswith('zip') or name == 'zip_code':
+        if donors is not None:
+            return pools.zips[donors % len(pools.zips)]
+        return pools.pick(pools.zips, rows)
+    if name in ('state', 'cand_st', 'cmte_st', 'cand_office_st'):
+        return pools.pick(STATES, rows)
+    if name.endswith('_dt'):
+        days = pd.Timestamp(f'{year - 1}-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+        return np.asarray(days.strftime('%m%d%Y'))
+    if name == 'transaction_amt':
+        return np.round(rng.lognormal(4, 1.5, rows), 2)
+    if name == 'transaction_tp':
+        return pools.pick(TRANSACTION_TYPES, rows)
+    if name == 'entity_tp':
+        return pools.pick(ENTITY_TYPES, rows)
+    if name == 'cand_office':
+        return pools.pick(OFFICES, rows)
+    if name == 'sub_id':
+        return sub_id_base + np.arange(rows, dtype=np.int64)
+    if name == 'linkage_id':
+        return sub_id_base % 10**12 + np.arange(rows)
+    if name in ('image_num', 'tran_id'):
+        return np.char.add('X', (sub_id_base % 10**9 + np.arange(rows)).astype(str))
+    if name == 'employer':
+        return pools.pick(pools.employers, rows)
+    if name == 'occupation':
+        return pools.pick(pools.occupations, rows)
+    if name.endswith('election_yr') or name == 'rpt_yr':
+        return np.full(rows, year)
+    if name in ('memo_cd', 'memo_text', '_unspecified_extra_col', 'back_ref_tran_id', 'cand_st2', 'connected_org_nm'):
+        return np.where(rng.random(rows) < 0.9, '', 'MEMO')
+    if sql_type.startswith('numeric'):
+        return np.round(rng.lognormal(8, 2, rows), 2)
+    if sql_type.startswith('integer'):
+        return rng.integers(1000000, 9999999, rows)
+    return np.char.add(name[:3].upper(), rng.integers(0, 20, rows).astype(str))
+
+def generate_table(table_name, path, rows, year, pools, sub_id_base):
+    donors = pools.rng.integers(0, pools.donor_count, rows) if table_name == 'individual_contributions' else None
+    frame = pd.DataFrame({
+        name: column_values(table_name, name, sql_type, rows, year, pools, donors, sub_id_base)
+        for name, sql_type in raw_columns(table_name)
+    })
+    frame.to_csv(path, sep='|', header=False, index=False, float_format=FLOAT_FORMAT)
+    return rows
+
+def generate_grid(table_name, path, rows, pools):
+    """Write a summary grid ZIP with rows records."""
+    record_tag, columns, numeric_columns, _ = GRIDS[table_name]
+    rng = pools.rng
+    member = os.path.basename(path).replace('.zip', '.xml')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive, archive.open(member, 'w') as f:
+        f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<grid>\n')
+        for i in range(rows):
+            fields = []
+            for column in columns:
+                if column in numeric_columns:
+                    value = f'{rng.lognormal(10, 2):.2f}'
+                elif column == 'com_id':
+                    value = f'C{i:08d}'
+                elif column in ('com_nam', 'can_nam'):
+                    value = f'NAME {i} &amp; CO'
+                elif column == 'cov_end_dat':
+                    value = '2024-06-30'
+                elif column == 'can_off_sta':
+                    value = STATES[i % len(STATES)]
+                elif column == 'can_off_dis':
+                    value = f'{i % 50:02d}'
+                else:
+                    value = 'H'
+                fields.append(f'<{column}>{value}</{column}>')
+            f.write(f'<{record_tag}>{"".join(fields)}</{record_tag}>\n'.encode())
+        f.write(b'</grid>\n')
+    return rows
+
+def generate(output_dir, rows, year=2024, zip_cardinality=20000, donor_repeat=4, seed=0):
+    """
+    Write one cycle of synthetic files under output_dir/<year>/ and the two
+    grid ZIPs under output_dir/. Returns {name: row count}.
+    """
+    rng = np.random.default_rng(seed)
+    pools = Pools(rows, zip_cardinality, donor_repeat, rng)
+    year_directory = os.path.join(output_dir, str(year))
+    os.makedirs(year_directory, exist_ok=True)
+
+    counts = {}
+    for i, table_name in enumerate(TABLES):
+        if table_name in ENTITY_TABLES:
+            table_rows = len(getattr(pools, ENTITY_TABLES[table_name][0]))
+        else:
+            table_rows = max(1, int(rows * TABLE_SCALES[table_name]))
+        sub_id_base = 4000000000000000000 + i * 10**12 + year * 10**7
+        counts[table_name] = generate_table(table_name, os.path.join(year_directory, f"{table_name}.txt"),
+                                            table_rows, year, pools, sub_id_base)
+    for table_name, rows_per_record in ROWS_PER_GRID_RECORD.items():
+        counts[table_name] = generate_grid(table_name, os.path.join(output_dir, f"{table_name}.zip"),
+                                           max(1, rows // rows_per_record), pools)
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Write synthetic FEC bulk files.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--rows", type=int, default=100000, help="individual_contributions rows")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--zip-cardinality", type=int, default=20000, help="Distinct ZIP codes")
+    parser.add_argument("--donor-repeat", type=float, default=4, help="Average contributions per donor")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, count in generate(args.output_dir, args.rows, args.year, args.zip_cardinality, args.donor_repeat,
+                                args.seed).items():
+        print(f"{name}: {count} rows")
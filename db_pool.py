@@ -0,0 +1,160 @@
+"""
+Bounded, instrumented Postgres connection pool for the Flask backend.
+
+psycopg2's ThreadedConnectionPool raises as soon as every connection is in
+use, and closes returned connections beyond minconn; this pool bounds
+checkouts with a semaphore so callers wait (up to a timeout) for a
+connection instead, keeps every returned connection for reuse,
+health-checks connections on checkout and keeps the counters needed to size
+the pool against the number of gunicorn workers and threads. Each gunicorn
+worker process has its own pool.
+"""
+import threading
+import time
+import psycopg2
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, minconn, maxconn, timeout=5.0, ping_interval=30.0, **connect_kwargs):
+        """
+        Parameters:
+        - minconn / maxconn: Connections opened up front / upper bound.
+        - timeout: Seconds a checkout waits for a free connection before PoolTimeout.
+        - ping_interval: Connections idle for longer than this are checked with
+          SELECT 1 before being handed out.
+        - connect_kwargs: Passed to psycopg2.connect.
+        """
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        # Every open connection, and those not checked out; a checkout holds a
+        # slot, so there are never more than maxconn
+        self._open = set()
+        self._idle = []
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+        self._stats = {
+            'checkouts': 0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'checkout_seconds_total': 0.0,
+            'checkout_seconds_max': 0.0,
+        }
+
+    def getconn(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise PoolTimeout(f"No database connection available within {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            conn = self._healthy_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self._stats
+            stats['checkouts'] += 1
+            stats['in_use'] += 1
+            stats['peak_in_use'] = max(stats['peak_in_use'], stats['in_use'])
+            stats['wait_seconds_total'] += waited
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], waited)
+            stats['checkout_seconds_total'] += elapsed
+            stats['checkout_seconds_max'] = max(stats['checkout_seconds_max'], elapsed)
+        return conn
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._open.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._open.discard(conn)
+        self._last_used.pop(id(conn), None)
+        if not conn.closed:
+            conn.close()
+
+    def _healthy_connection(self):
+        # One retry: a stale connection is discarded and replaced by a fresh one
+        for attempt in range(2):
+            with self._lock:
+                conn = self._idle.pop() if self._idle and not attempt else None
+            if conn is None:
+                conn = self._connect()
+            if self._is_healthy(conn):
+                return conn
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            self._discard(conn)
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0.0) < self.ping_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def putconn(self, conn):
+        close = bool(conn.closed)
+        if not close:
+            try:
+                conn.rollback()
+                self._last_used[id(conn)] = time.monotonic()
+            except psycopg2.Error:
+                close = True
+        if close:
+            self._discard(conn)
+        with self._lock:
+            if not close:
+                self._idle.append(conn)
+            self._stats['in_use'] -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = len(self._open)
+            stats['idle'] = len(self._idle)
+        checkouts = stats['checkouts'] or 1
+        stats['max_size'] = self.maxconn
+        stats['wait_seconds_avg'] = stats['wait_seconds_total'] / checkouts
+        stats['checkout_seconds_avg'] = stats['checkout_seconds_total'] / checkouts
+        return stats
+
+    def closeall(self):
+        with self._lock:
+            connections = list(self._open)
+            self._open.clear()
+            self._idle.clear()
+        for conn in connections:
+            if not conn.closed:
+                conn.close()
@@ -0,0 +1,43 @@
+"""
+Vectorized parsing of FEC MMDDYYYY transaction dates.
+
+Bulk files store dates as MMDDYYYY text, but once a column has been through a
+numeric dtype it shows up as 5112018 or 5112018.0 (leading zero lost, float
+suffix added). Both spellings are accepted; anything else becomes NaT/None
+rather than a made-up default date.
+
+A cycle only spans a few thousand distinct dates, so each distinct spelling is
+parsed once and the results are broadcast back onto the rows through the
+factorized codes.
+"""
+import numpy as np
+import pandas as pd
+
+def parse_fec_dates(values):
+    """
+    Parse a column of MMDDYYYY values into a datetime64 Series.
+    Missing, malformed and impossible dates (e.g. 02302018) become NaT.
+    """
+    values = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    # The trailing NaT is what missing values (code -1) index into
+    parsed = _parse_unique_dates(uniques).append(pd.DatetimeIndex([pd.NaT]))
+    return pd.Series(parsed[codes], index=values.index)
+
+def format_fec_dates(values):
+    """
+    Parse a column of MMDDYYYY values into 'YYYY-MM-DD' strings, with None for
+    anything that isn't a valid date.
+    """
+    values = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    parsed = _parse_unique_dates(uniques)
+    formatted = np.append(parsed.strftime('%Y-%m-%d').to_numpy(dtype=object), None)
+    formatted[:-1][parsed.isna()] = None
+    return pd.Series(formatted[codes], index=values.index, dtype=object)
+
+def _parse_unique_dates(uniques):
+    dates = pd.Series(uniques, dtype=object).astype('string').str.strip()
+    dates = dates.str.replace(r'\.0*$', '', regex=True)
+    dates = dates.where(dates.str.fullmatch(r'\d{7,8}').fillna(False).astype(bool))
+    return pd.DatetimeIndex(pd.to_datetime(dates.str.zfill(8), format='%m%d%Y', errors='coerce'))
@@ -0,0 +1,361 @@
+"""
+Resumable, cached downloads of the FEC bulk files.
+
+Files come from BASE_URL, which is the FEC's S3 bucket unless FEC_BULK_URL
+(or --base-url) points at a mirror or a test server. They are fetched into
+DOWNLOAD_DIRECTORY with the bucket's layout (<year>/<file>.zip), so that
+directory can itself be served as a mirror.
+
+Each file gets a .meta sidecar holding its ETag and Last-Modified. A later
+fetch sends them as a conditional GET and keeps the cached copy if the
+server answers 304.
+
+A download is written to a .part file first. If the connection drops, the
+download is resumed with a Range request from the last byte received.
+If-Range makes sure every piece comes from the same version of the file.
+A run that was interrupted part way resumes its .part file the same way.
+
+The first member of an archive is decompressed as a stream (iter_unzip,
+like funzip). A dataset can therefore go from the network straight into
+COPY without touching disk.
+"""
+import io
+import os
+import json
+import time
+import zlib
+import codecs
+import struct
+import itertools
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+BASE_URL = os.environ.get(
+    'FEC_BULK_URL',
+    'https://cg-519a459a-0ea3-42c2-b7bc-fa1143481f74.s3-us-gov-west-1.amazonaws.com/bulk-downloads',
+)
+DOWNLOAD_DIRECTORY = os.environ.get(
+    'FEC_DOWNLOAD_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'downloads'),
+)
+
+BLOCK_SIZE = 1 << 20
+# Seconds to wait for the server to connect or send more data
+TIMEOUT = 60
+# Resumes attempted after a dropped connection, waiting RETRY_DELAY seconds
+# before the first and twice as long before each one after it
+RETRIES = 5
+RETRY_DELAY = 2
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+ZIP_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+ZIP_LOCAL_SIGNATURE = 0x04034b50
+ZIP_DESCRIPTOR_SIGNATURE = 0x08074b50
+ZIP_STORED, ZIP_DEFLATED = 0, 8
+# General purpose flag: CRC and sizes follow the data instead of the header
+ZIP_HAS_DESCRIPTOR = 0x08
+
+class DownloadChanged(Exception):
+    """The file changed on the server while it was being downloaded."""
+
+class Download:
+    """
+    The body of url from byte offset on, as an iterable of blocks.
+
+    A connection that drops is reopened with a Range request from the last
+    byte received, up to RETRIES times. validator (an ETag or Last-Modified
+    value; taken from the first response when not given) is sent as
+    If-Range, and DownloadChanged is raised if the file changed in between.
+    headers go with the first request only, e.g. for a conditional GET;
+    not_modified is set when the server answers it with 304.
+    """
+
+    def __init__(self, url, offset=0, validator=None, headers=None):
+        self.url = url
+        self.offset = offset
+        self.validator = validator
+        self.headers = headers or {}
+        self.not_modified = False
+        self.etag = self.last_modified = None
+
+    def __iter__(self):
+        headers = self.headers
+        attempt = 0
+        while True:
+            try:
+                for block in self._request(headers):
+                    attempt = 0
+                    yield block
+                return
+            except RETRYABLE_ERRORS as error:
+                if attempt >= RETRIES:
+                    raise
+                delay = RETRY_DELAY * 2 ** attempt
+                attempt += 1
+                print(f"Download of {self.url} interrupted at byte {self.offset} ({error}); "
+                      f"resuming in {delay}s")
+                time.sleep(delay)
+                headers = {}
+
+    def _request(self, headers):
+        headers = dict(headers)
+        if self.offset:
+            headers['Range'] = f'bytes={self.offset}-'
+            if self.validator:
+                headers['If-Range'] = self.validator
+        with requests.get(self.url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 304:
+                self.not_modified = True
+                return
+            if response.status_code == 416:
+                raise DownloadChanged(f"{self.url} is shorter than the {self.offset} bytes already received")
+            response.raise_for_status()
+
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            # Weak ETags can't be used with If-Range
+            validator = etag if etag and not etag.startswith('W/') else last_modified
+            skip = 0
+            if self.offset and response.status_code != 206:
+                # The whole file came back: either the server ignores ranges, or
+                # If-Range failed because the file changed
+                if not self.validator or validator != self.validator:
+                    raise DownloadChanged(f"{self.url} changed after {self.offset} bytes were received")
+                skip = self.offset
+            self.etag, self.last_modified = etag, last_modified
+            self.validator = self.validator or validator
+
+            for block in response.iter_content(BLOCK_SIZE):
+                if skip:
+                    cut = min(skip, len(block))
+                    block, skip = block[cut:], skip - cut
+                if block:
+                    self.offset += len(block)
+                    yield block
+
+def cache_path(url, directory=None):
+    """Where fetch keeps url: <directory>/<year>/<file name>, as in the bucket."""
+    parts = urlsplit(url).path.rstrip('/').split('/')
+    return os.path.join(directory or DOWNLOAD_DIRECTORY, *parts[-2:])
+
+def read_meta(path):
+    try:
+        with open(f'{path}.meta') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_meta(path, meta):
+    tmp_path = f'{path}.meta.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, f'{path}.meta')
+
+def remove_file(path):
+    for name in (path, f'{path}.meta'):
+        if os.path.exists(name):
+            os.remove(name)
+
+def fetch(url, path=None):
+    """
+    Download url to path (cache_path(url) by default) unless the copy already
+    there is current. Resumes a .part file left by an interrupted run, and
+    starts over if the file changed on the server since.
+
+    Returns (path, changed), where changed is False if the cached copy was kept.
+    """
+    path = path or cache_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = f'{path}.part'
+
+    part_meta = read_meta(part_path)
+    if os.path.exists(part_path) and part_meta.get('url') == url and part_meta.get('validator'):
+        offset, validator, headers = os.path.getsize(part_path), part_meta['validator'], {}
+        print(f"Resuming download of {url} at byte {offset} ...")
+    else:
+        remove_file(part_path)
+        offset, validator, headers = 0, None, {}
+        meta = read_meta(path)
+        if os.path.exists(path) and meta.get('url') == url:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        print(f"Downloading {url} ...")
+
+    while True:
+        download = Download(url, offset, validator, headers)
+        part = None
+        try:
+            for block in download:
+                if part is None:
+                    # Record the version being downloaded so a later run can resume it
+                    write_meta(part_path, {'url': url, 'validator': download.validator})
+                    part = open(part_path, 'ab' if offset else 'wb')
+                part.write(block)
+        except DownloadChanged as error:
+            print(f"{error}; starting over")
+            remove_file(part_path)
+            offset, validator, headers = 0, None, {}
+            continue
+        finally:
+            if part is not None:
+                part.close()
+        break
+
+    if download.not_modified:
+        print(f"{url} is unchanged; using {path}")
+        return path, False
+    if part is None:
+        # Empty file
+        open(part_path, 'wb').close()
+    os.replace(part_path, path)
+    write_meta(path, {'url': url, 'etag': download.etag, 'last_modified': download.last_modified})
+    os.remove(f'{part_path}.meta')
+    return path, True
+
+def fetch_all(urls, workers=4):
+    """fetch every url, workers at a time. Returns {url: (path, changed)}."""
+    with ThreadPoolExecutor(workers) as fetchers:
+        return dict(zip(urls, fetchers.map(fetch, urls)))
+
+def iter_file(f):
+    return iter(lambda: f.read(BLOCK_SIZE), b'')
+
+def iter_unzip(blocks):
+    """
+    Yield the decompressed bytes of the first member of a ZIP archive given
+    as a stream of blocks, reading only its local header (as funzip does).
+    The member's CRC is checked, so a truncated or corrupt archive raises
+    ValueError instead of ending early.
+    """
+    blocks = iter(blocks)
+    buffer = b''
+
+    def read_at_least(size):
+        nonlocal buffer
+        while len(buffer) < size:
+            block = next(blocks, None)
+            if block is None:
+                raise ValueError("ZIP archive is truncated")
+            buffer += block
+
+    read_at_least(ZIP_LOCAL_HEADER.size)
+    signature, _, flags, method, _, _, crc, compressed_size, _, name_length, extra_length = \
+        ZIP_LOCAL_HEADER.unpack_from(buffer)
+    if signature != ZIP_LOCAL_SIGNATURE:
+        raise ValueError("Not a ZIP archive")
+    data_start = ZIP_LOCAL_HEADER.size + name_length + extra_length
+    read_at_least(data_start)
+    buffer = buffer[data_start:]
+
+    checksum = 0
+    if method == ZIP_DEFLATED:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        for block in itertools.chain([buffer], blocks):
+            data = decompressor.decompress(block)
+            checksum = zlib.crc32(data, checksum)
+            if data:
+                yield data
+            if decompressor.eof:
+                break
+        if not decompressor.eof:
+            raise ValueError("ZIP archive is truncated")
+        buffer = decompressor.unused_data
+    elif method == ZIP_STORED and not flags & ZIP_HAS_DESCRIPTOR and compressed_size != 0xFFFFFFFF:
+        remaining = compressed_size
+        for block in itertools.chain([buffer], blocks):
+            data, buffer = block[:remaining], block[remaining:]
+            remaining -= len(data)
+            checksum = zlib.crc32(data, checksum)
+            if data:
+                yield data
+            if not remaining:
+                break
+        if remaining:
+            raise ValueError("ZIP archive is truncated")
+    else:
+        raise ValueError(f"Unsupported ZIP member (compression method {method})")
+
+    if flags & ZIP_HAS_DESCRIPTOR:
+        # CRC-32, optionally preceded by a signature, then the sizes
+        read_at_least(8)
+        has_signature = struct.unpack_from('<I', buffer)[0] == ZIP_DESCRIPTOR_SIGNATURE
+        (crc,) = struct.unpack_from('<I', buffer, 4 if has_signature else 0)
+    if checksum != crc:
+        raise ValueError("ZIP member failed its CRC check")
+
+def iter_dataset_text(blocks):
+    """
+    Decompress a dataset archive given as blocks and yield its text as clean
+    UTF-8: undecodable bytes and backspaces are dropped, as the old
+    funzip | iconv -c -t UTF-8 | tr -d '\\010' pipeline did.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+    for block in iter_unzip(blocks):
+        yield decoder.decode(block).replace('\x08', '').encode('utf-8')
+    yield decoder.decode(b'', final=True).encode('utf-8')
+
+def extract_dataset(archive_path, path):
+    """Write the clean text of the dataset archive at archive_path to path."""
+    with open(archive_path, 'rb') as archive, open(path, 'wb') as f:
+        for block in iter_dataset_text(iter_file(archive)):
+            f.write(block)
+    return path
+
+class BlockReader(io.RawIOBase):
+    """Readable binary file over an iterable of bytes blocks."""
+
+    def __init__(self, blocks):
+        self._blocks = iter(blocks)
+        self._buffer = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._buffer = memoryview(block)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        close = getattr(self._blocks, 'close', None)
+        if close is not None:
+            close()
+        super().close()
+
+def open_dataset(url):
+    """
+    Open the dataset archive at url as a binary file of its clean text,
+    downloaded (with resumes) and decompressed as it is read.
+    """
+    return io.BufferedReader(BlockReader(iter_dataset_text(Download(url))), BLOCK_SIZE)
+
+if __name__ == "__main__":
+    import argparse
+    from load_fec import DATASETS, full_url
+    from grid_import import GRIDS, grid_url
+
+    parser = argparse.ArgumentParser(description="Fetch FEC bulk files into the download cache, e.g. to "
+                                                 "prepare a load or build a local mirror.")
+    parser.add_argument("years", nargs="+", type=int)
+    parser.add_argument("--base-url", help="Mirror of the FEC bulk-downloads bucket (default: $FEC_BULK_URL)")
+    parser.add_argument("--directory", help="Download directory (default: $FEC_DOWNLOAD_DIR or data/downloads)")
+    parser.add_argument("--grids", action="store_true", help="Also fetch the committee and candidate summary grids")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
+    args = parser.parse_args()
+
+    if args.directory:
+        DOWNLOAD_DIRECTORY = args.directory
+    urls = [full_url(fec_abbreviation, year, args.base_url) for year in args.years for fec_abbreviation, _ in DATASETS]
+    if args.grids:
+        urls += [grid_url(table_name, year, args.base_url) for year in args.years for table_name in GRIDS]
+    for url, (path, changed) in fetch_all(urls, args.workers).items():
+        print(f"{path}: {'downloaded' if changed else 'unchanged'}")
@@ -0,0 +1,89 @@
+"""
+Streaming importer for the FEC committee and candidate summary grids.
+
+The grids are published as one large XML document inside a ZIP archive. The
+XML member is parsed straight out of the archive with iterparse, one record
+element at a time, and each element is discarded once its row has been
+queued, so memory use doesn't grow with the size of the grid. Rows are
+COPYed in pages (batch_writes.BatchWriter) into a session-local staging table
+and moved into the grid table with a single INSERT, in document order.
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+import fec_download
+from batch_writes import BatchWriter, copy_page_writer
+
+# table -> (record element, columns, numeric columns, conflict clause).
+# Numeric columns missing from a record are stored as 0.
+GRIDS = {
+    'committee_grid': (
+        'com_sum',
+        ['com_nam', 'com_id', 'com_typ', 'com_des', 'org_tp', 'tot_rec', 'tot_dis', 'cas_on_han_clo_of_per',
+         'cov_end_dat'],
+        {'tot_rec', 'tot_dis', 'cas_on_han_clo_of_per'},
+        'ON CONFLICT (com_id) DO NOTHING',
+    ),
+    'candidate_grid': (
+        'candidate',
+        ['can_nam', 'lin_ima', 'can_off', 'can_off_sta', 'can_off_dis', 'can_par_aff', 'can_inc_cha_ope_sea',
+         'tot_rec', 'tot_dis', 'cas_on_han_clo_of_per', 'deb_owe_by_com', 'cov_end_dat'],
+        {'tot_rec', 'tot_dis', 'cas_on_han_clo_of_per', 'deb_owe_by_com'},
+        '',
+    ),
+}
+
+def grid_url(table_name, year, base_url=None):
+    grid_name = table_name.replace('_grid', '_summary_grid')
+    return f"{(base_url or fec_download.BASE_URL).rstrip('/')}/{year}/{grid_name}{year}.zip"
+
+def download_grid(url):
+    """Fetch url into the download cache (kept if still current) and open it."""
+    path, _ = fec_download.fetch(url)
+    return open(path, 'rb')
+
+def iter_grid_rows(xml_file, record_tag, columns, numeric_columns):
+    """Yield one tuple of column values per record element in xml_file."""
+    context = ET.iterparse(xml_file, events=('start', 'end'))
+    _, root = next(context)
+    for event, element in context:
+        if event != 'end' or element.tag != record_tag:
+            continue
+        values = {child.tag: child.text for child in element}
+        for column in numeric_columns:
+            if values.get(column) is None:
+                values[column] = 0
+        yield tuple(values.get(column) for column in columns)
+        # Drop the finished record (and anything else parsed so far) from the tree
+        root.clear()
+
+def import_grid(conn, table_name, source, page_size=10000, progress_interval=100000):
+    """
+    Import a summary grid into table_name, which must already exist.
+
+    Parameters:
+    - conn: A connection object to the PostgreSQL database.
+    - table_name: 'committee_grid' or 'candidate_grid'.
+    - source: Path or binary file object for the grid ZIP archive; the XML
+      document is read from its first member.
+    - page_size: Rows buffered per COPY.
+    - progress_interval: Print progress every this many rows.
+    """
+    record_tag, columns, numeric_columns, conflict_clause = GRIDS[table_name]
+    column_list = ', '.join(columns)
+    staging = f"temp_{table_name}"
+
+    cur = conn.cursor()
+    # ordinal keeps document order, so the first of several duplicate records wins
+    cur.execute(f"CREATE TEMP TABLE {staging} (LIKE {table_name}, ordinal BIGSERIAL) ON COMMIT DROP")
+    # No commit interval: committing would drop the staging table
+    writer = BatchWriter(conn, copy_page_writer(staging, columns), page_size=page_size,
+                         progress_interval=progress_interval, label=table_name)
+    with writer, zipfile.ZipFile(source) as archive, archive.open(archive.namelist()[0]) as xml_file:
+        writer.extend(iter_grid_rows(xml_file, record_tag, columns, numeric_columns))
+
+    cur.execute(f"INSERT INTO {table_name} ({column_list}) SELECT {column_list} FROM {staging} "
+                f"ORDER BY ordinal {conflict_clause}")
+    conn.commit()
+    cur.close()
+    print(f"Imported {writer.count} rows into {table_name}")
+    return writer.count
@@ -0,0 +1,699 @@
+"""
+Parallel loader for FEC bulk data.
+
+Every (year, dataset) file moves through three stages: download, preprocess
+and load. Each stage has its own pool, so one file can download while another
+is being preprocessed and a third is being copied into Postgres:
+
+- downloads run in a thread pool (fec_download: resumable, and skipped when
+  the cached archive is still current),
+- preprocessing (pandas or pyarrow, CPU-bound) runs in a process pool,
+- loads run in a thread pool, each on its own database connection.
+
+A file moves to the next stage as soon as its previous stage finishes. The
+query layer is refreshed and the data version bumped once everything is in.
+
+With --stream the three stages are fused instead: each file is downloaded,
+preprocessed and fed to COPY FROM STDIN in one pass, one file per process,
+without ever being written to disk.
+
+With --bulk the tables are created without primary keys and every file is
+copied into an UNLOGGED staging table with no indexes. Once all files are in,
+the staging tables are deduplicated into their tables, and the primary keys
+and query layer indexes are built in parallel before a final ANALYZE.
+
+Tables partitioned by file_year (see sql/) get one partition per cycle. A new
+cycle is loaded into a standalone <table>_<year> table that is attached once
+it is complete, and --replace detaches and drops a cycle's partitions before
+reloading it.
+
+With --sync an already loaded cycle is brought up to date in place instead:
+each file is staged and compared with the stored rows by fingerprint, and
+only the rows that were added, changed or removed are written, in one
+transaction per file, so readers never see a partly synced table.
+"""
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import psycopg2
+import psycopg2.errors
+from preprocess_data import preprocess_file, preprocess_stream, extract_primary_key_from_sql, ENGINES, \
+    OUTPUT_FORMATS
+import pg_binary_copy
+import fec_download
+from query_layer import refresh_query_layer, bump_data_version, create_extensions, index_statements
+
+# Database connection details
+DB_NAME = "fec_data"
+DB_USER = "postgres"
+DB_PASSWORD = "climbing"
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+SQL_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'sql')
+DATA_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'data')
+
+# (FEC abbreviation, table name)
+DATASETS = [
+    ('cn', 'candidate_master'),
+    ('ccl', 'candidate_committee_linkages'),
+    ('webl', 'house_senate_current_campaigns'),
+    ('cm', 'committee_master'),
+    ('webk', 'pac_summary'),
+    ('indiv', 'individual_contributions'),
+    ('pas2', 'committee_candidate_contributions'),
+    ('oth', 'committee_transactions'),
+    ('oppexp', 'operating_expenditures'),
+]
+
+# Dropped before a full (non --append) load
+TABLES_TO_DROP = [
+    'candidate_master', 'candidate_committee_linkages', 'house_senate_current_campaigns',
+    'committee_master', 'pac_summary', 'individual_contributions', 'committee_candidate_contributions',
+    'committee_transactions', 'operating_expenditures', 'donor_summary', 'changed_donors',
+    'changed_committees', 'data_version',
+]
+
+# Rows per chunk when preprocessing a streamed download
+STREAM_CHUNKSIZE = 100000
+# Bytes psycopg2 asks for per read while feeding COPY FROM STDIN
+COPY_BUFFER_SIZE = 1 << 20
+
+# Record the keys touched by a load so postprocess_data.py can recompute only
+# the affected donor and committee aggregates. {loaded} is the set of rows the
+# load added. Keys are inserted in sorted order so concurrent loads can't
+# deadlock on the same key.
+CHANGE_RECORDERS = {
+    'individual_contributions': (
+        "INSERT INTO changed_donors SELECT DISTINCT name, zip_code FROM {loaded} "
+        "WHERE name IS NOT NULL AND zip_code IS NOT NULL ORDER BY name, zip_code ON CONFLICT DO NOTHING"
+    ),
+    'committee_transactions': (
+        "INSERT INTO changed_committees SELECT DISTINCT cmte_id FROM {loaded} "
+        "WHERE cmte_id IS NOT NULL ORDER BY cmte_id ON CONFLICT DO NOTHING"
+    ),
+}
+CHANGE_RECORDERS['candidate_committee_linkages'] = CHANGE_RECORDERS['committee_transactions']
+
+# Columns identifying a row within a cycle for the tables without a primary key.
+# --sync uses them (or the primary key) to tell updated rows from added/removed ones.
+ROW_KEYS = {
+    'committee_transactions': ['sub_id'],
+    'operating_expenditures': ['sub_id'],
+    'committee_candidate_contributions': ['sub_id'],
+    'candidate_committee_linkages': ['linkage_id'],
+    'house_senate_current_campaigns': ['cand_id'],
+}
+
+def connect():
+    return psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+def full_url(dataset_abbreviation, year, base_url=None):
+    return f"{(base_url or fec_download.BASE_URL).rstrip('/')}/{year}/{dataset_abbreviation}{str(year)[-2:]}.zip"
+
+def data_file_path(year, table_name):
+    return os.path.join(DATA_DIRECTORY, str(year), f"{table_name}.txt")
+
+def sql_file_path(table_name):
+    return os.path.join(SQL_DIRECTORY, f"{table_name}.sql")
+
+def source_file_path(source_directory, year, table_name):
+    """Raw file of a local snapshot, laid out like data/ before preprocessing."""
+    return os.path.join(source_directory, str(year), f"{table_name}.txt")
+
+def row_key(table_name):
+    return ROW_KEYS.get(table_name) or [column for column in extract_primary_key_from_sql(sql_file_path(table_name))
+                                        if column != 'file_year']
+
+def bulk_staging_table(table_name):
+    return f"bulk_{table_name}"
+
+def partition_name(table_name, year):
+    return f"{table_name}_{int(year)}"
+
+def sql_files(sql_directory=SQL_DIRECTORY):
+    paths = []
+    for directory, _, files in os.walk(sql_directory):
+        paths.extend(os.path.join(directory, name) for name in files if name.endswith('.sql'))
+    return sorted(paths)
+
+def create_tables(conn, drop=False):
+    """Create the tables from sql/, dropping the existing ones first if drop is set."""
+    cur = conn.cursor()
+    if drop:
+        print("Dropping existing tables if they exist...")
+        cur.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES_TO_DROP)} CASCADE")
+    for table_def_file in sql_files():
+        print(f"Creating table from {table_def_file} ...")
+        with open(table_def_file) as f:
+            cur.execute(f.read())
+    conn.commit()
+    cur.close()
+
+def download_dataset(fec_abbreviation, table_name, year, source_directory=None, base_url=None):
+    """
+    Download one dataset's archive (unless the cached copy is current) and
+    extract it to its data file, or copy the file from a local snapshot in
+    source_directory.
+    """
+    path = data_file_path(year, table_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if source_directory:
+        source = source_file_path(source_directory, year, table_name)
+        print(f"Copying {table_name} for {year} from {source} ...")
+        shutil.copyfile(source, path)
+        return path
+    archive, _ = fec_download.fetch(full_url(fec_abbreviation, year, base_url))
+    print(f"Extracting {table_name} for {year} from {archive} ...")
+    return fec_download.extract_dataset(archive, path)
+
+def preprocess_dataset(table_name, year, chunksize=None, engine='pandas', output_format='csv'):
+    path = data_file_path(year, table_name)
+    print(f"Preprocessing {path} for year {year}")
+    preprocess_file(path, sql_file_path(table_name), year, f"{table_name}.txt", chunksize=chunksize, engine=engine,
+                    output_format=output_format)
+    return path
+
+def load_dataset(table_name, year, bulk=False, sync=False):
+    """Copy a preprocessed data file, text or binary COPY data, into its table."""
+    path = data_file_path(year, table_name)
+    with open(path, 'rb') as f:
+        binary = pg_binary_copy.is_binary(f.read(len(pg_binary_copy.SIGNATURE)))
+        f.seek(0)
+        # Name the file's columns explicitly so columns added later by postprocessing
+        # (e.g. candidate_committee_linkages.committee_total) don't break the copy
+        if binary:
+            columns = ', '.join(pg_binary_copy.read_header(f))
+        else:
+            columns = f.readline().decode('utf-8').rstrip('\r\n').replace('|', ', ')
+        f.seek(0)
+        print(f"Loading {path} into {table_name}...")
+        conn = connect()
+        try:
+            copy_rows(conn, table_name, year, columns, f, bulk=bulk, binary=binary, sync=sync)
+        finally:
+            conn.close()
+    return path
+
+def stream_dataset(fec_abbreviation, table_name, year, chunksize=None, bulk=False, output_format='csv',
+                   sync=False, source_directory=None, base_url=None):
+    """
+    Download, preprocess and COPY one dataset in a single pass. The download
+    (or a local snapshot's file) is decompressed and parsed in chunks and the
+    preprocessed rows are fed straight to COPY FROM STDIN, as text or as
+    binary COPY data, so the data never touches disk. A download that fails
+    part way raises before anything is committed.
+    """
+    if source_directory:
+        source = source_file_path(source_directory, year, table_name)
+        data = open(source, 'rb')
+    else:
+        source = full_url(fec_abbreviation, year, base_url)
+        data = fec_download.open_dataset(source)
+    print(f"Streaming {table_name} for {year} from {source} ...")
+    try:
+        rows = preprocess_stream(data, sql_file_path(table_name), year, f"{table_name}.txt",
+                                 chunksize or STREAM_CHUNKSIZE, output_format)
+        header = next(rows, None)
+        conn = connect()
+        try:
+            if header is not None and output_format == 'binary':
+                # The binary header names the columns and is part of the COPY data
+                columns = ', '.join(pg_binary_copy.read_header(io.BytesIO(header)))
+                copy_rows(conn, table_name, year, columns, IteratorFile(itertools.chain([header], rows)),
+                          commit=False, bulk=bulk, binary=True, sync=sync)
+            elif header is not None:
+                copy_rows(conn, table_name, year, header.rstrip('\n').replace('|', ', '), IteratorFile(rows),
+                          header=False, commit=False, bulk=bulk, sync=sync)
+            conn.commit()
+        finally:
+            conn.close()
+    finally:
+        data.close()
+
+def copy_rows(conn, table_name, year, columns, source, header=True, commit=True, bulk=False, binary=False,
+              sync=False):
+    """
+    COPY the rows in source (a file object) into table_name.
+
+    If a partitioned table has no rows for this file_year yet, the rows are
+    copied straight into a new partition that is attached afterwards; rows
+    repeating a primary key are dropped first if the attach finds any.
+    Otherwise they go through a session-local staging table and only rows
+    whose primary key isn't already present are inserted. An unpartitioned
+    table without a primary key has the rows of a new cycle copied straight in.
+    With bulk set, the rows are only appended to the table's bulk staging table.
+    With binary set, source holds binary COPY data and header is ignored.
+    With sync set, a cycle that already has rows is replaced by the staged rows
+    instead (see sync_rows).
+    """
+    options = copy_options(header, binary)
+    cur = conn.cursor()
+    existing = deduplicate = partitioned = False
+    if bulk:
+        target = bulk_staging_table(table_name)
+    else:
+        partitioned = is_partitioned(cur, table_name)
+        if partitioned:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (partition_name(table_name, year),))
+        else:
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name} WHERE file_year = %s)", (year,))
+        existing = cur.fetchone()[0]
+        primary_key = extract_primary_key_from_sql(sql_file_path(table_name))
+        deduplicate = existing or (bool(primary_key) and not partitioned)
+        if deduplicate:
+            target = f"temp_{table_name}"
+            # Without the table's keys and indexes, so duplicate rows in the file can be staged
+            cur.execute(f"CREATE TEMP TABLE {target} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP")
+        elif partitioned:
+            target = create_detached_partition(cur, table_name, year)
+        else:
+            target = table_name
+
+    cur.copy_expert(f"COPY {target} ({columns}) FROM STDIN WITH ({options})", source, size=COPY_BUFFER_SIZE)
+    if existing and sync:
+        sync_rows(cur, table_name, year, columns, target)
+        if commit:
+            conn.commit()
+        cur.close()
+        return
+    if deduplicate:
+        cur.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {target} ON CONFLICT DO NOTHING")
+    print(f"Inserted {cur.rowcount} rows into {table_name if deduplicate else target} for {year}")
+    if partitioned and not deduplicate:
+        attach_partition_deduplicated(cur, table_name, year, primary_key)
+
+    if not bulk and table_name in CHANGE_RECORDERS:
+        loaded = target if deduplicate else f"(SELECT * FROM {table_name} WHERE file_year = {int(year)}) loaded"
+        cur.execute(CHANGE_RECORDERS[table_name].format(loaded=loaded))
+    if commit:
+        conn.commit()
+    cur.close()
+
+def copy_options(header=True, binary=False):
+    """The COPY ... FROM STDIN options for a preprocessed file."""
+    if binary:
+        return "FORMAT binary"
+    return f"FORMAT CSV, DELIMITER '|', HEADER {'TRUE' if header else 'FALSE'}, QUOTE E'\\b'"
+
+def sync_rows(cur, table_name, year, columns, staged):
+    """
+    Make table_name's rows for year match the rows in the staging table
+    staged, writing only the difference.
+
+    Every row is fingerprinted by the md5 of its loaded columns, on both
+    sides. Stored rows whose fingerprint isn't staged are deleted and staged
+    rows whose fingerprint isn't stored are inserted; a changed row is both,
+    and is counted as updated when its row_key appears on both sides. The
+    donor and committee keys of the deleted and inserted rows are recorded as
+    changed. A staged row whose primary key is already taken by another
+    staged or kept row is skipped. Runs in the caller's transaction.
+    """
+    fingerprint = f"md5(ROW({columns})::text)::uuid"
+    cur.execute(f"CREATE TEMP TABLE sync_stored ON COMMIT DROP AS "
+                f"SELECT ctid AS row_id, {fingerprint} AS fingerprint FROM {table_name} WHERE file_year = %s", (year,))
+    cur.execute(f"CREATE TEMP TABLE sync_staged ON COMMIT DROP AS "
+                f"SELECT ctid AS row_id, {fingerprint} AS fingerprint FROM {staged}")
+    cur.execute("CREATE TEMP TABLE sync_removed ON COMMIT DROP AS SELECT row_id FROM sync_stored s "
+                "WHERE NOT EXISTS (SELECT 1 FROM sync_staged n WHERE n.fingerprint = s.fingerprint)")
+    cur.execute("CREATE TEMP TABLE sync_added ON COMMIT DROP AS SELECT row_id FROM sync_staged n "
+                "WHERE NOT EXISTS (SELECT 1 FROM sync_stored s WHERE s.fingerprint = n.fingerprint)")
+
+    removed = f"(SELECT * FROM {table_name} WHERE file_year = {int(year)} " \
+              f"AND ctid = ANY(ARRAY(SELECT row_id FROM sync_removed))) removed"
+    added = f"(SELECT * FROM {staged} WHERE ctid = ANY(ARRAY(SELECT row_id FROM sync_added))) added"
+    key = ', '.join(row_key(table_name))
+    cur.execute(f"SELECT (SELECT count(*) FROM sync_removed), (SELECT count(*) FROM sync_added), "
+                f"(SELECT count(*) FROM (SELECT DISTINCT {key} FROM {removed}) r "
+                f"JOIN (SELECT DISTINCT {key} FROM {added}) a USING ({key}))")
+    removed_count, added_count, updated = cur.fetchone()
+
+    if table_name in CHANGE_RECORDERS:
+        cur.execute(CHANGE_RECORDERS[table_name].format(loaded=removed))
+        cur.execute(CHANGE_RECORDERS[table_name].format(loaded=added))
+    cur.execute(f"DELETE FROM {table_name} WHERE file_year = %s AND ctid = ANY(ARRAY(SELECT row_id FROM sync_removed))",
+                (year,))
+    cur.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {added} ON CONFLICT DO NOTHING")
+    print(f"Synced {table_name} for {year}: {added_count - updated} inserted, {updated} updated, "
+          f"{removed_count - updated} deleted")
+
+def is_partitioned(cur, table_name):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", (table_name,))
+    return cur.fetchone()[0]
+
+def create_detached_partition(cur, table_name, year):
+    """
+    Create an empty standalone table shaped like table_name's partition for year.
+    Its CHECK constraint lets attach_partition skip the validation scan.
+    """
+    partition = partition_name(table_name, year)
+    cur.execute(f"CREATE TABLE {partition} (LIKE {table_name} INCLUDING DEFAULTS, "
+                f"CONSTRAINT {partition}_file_year_check CHECK (file_year IS NOT NULL AND file_year = {int(year)}))")
+    return partition
+
+def attach_partition(cur, table_name, year):
+    """
+    Attach a table built by create_detached_partition. Postgres builds the
+    parent's indexes on it as part of the attach.
+    """
+    partition = partition_name(table_name, year)
+    cur.execute(f"ALTER TABLE {table_name} ATTACH PARTITION {partition} FOR VALUES IN ({int(year)})")
+    # Redundant with the partition bound once attached
+    cur.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {partition}_file_year_check")
+
+def attach_partition_deduplicated(cur, table_name, year, primary_key):
+    """
+    attach_partition, but if building the primary key on the new partition
+    fails on a duplicate key, drop every row but the first for each key and
+    attach again. Files rarely repeat a key, so they aren't checked up front.
+    """
+    cur.execute("SAVEPOINT attach_partition")
+    try:
+        attach_partition(cur, table_name, year)
+    except psycopg2.errors.UniqueViolation:
+        cur.execute("ROLLBACK TO SAVEPOINT attach_partition")
+        partition = partition_name(table_name, year)
+        key = ', '.join(primary_key)
+        cur.execute(f"""
+            DELETE FROM {partition} WHERE ctid = ANY(ARRAY(
+                SELECT ctid FROM (
+                    SELECT ctid, row_number() OVER (PARTITION BY {key} ORDER BY ctid) AS position
+                    FROM {partition}
+                ) numbered
+                WHERE position > 1
+            ))
+        """)
+        print(f"Dropped {cur.rowcount} rows with a duplicate ({key}) from {partition}")
+        attach_partition(cur, table_name, year)
+    cur.execute("RELEASE SAVEPOINT attach_partition")
+
+def replace_years(conn, years):
+    """
+    Remove the given cycles from the dataset tables so they can be reloaded:
+    partitions are detached and dropped, and unpartitioned tables have the
+    cycle's rows deleted. The removed rows' donor and committee keys are
+    recorded as changed, and postprocessing progress for the cycles is reset.
+    """
+    cur = conn.cursor()
+    for _, table_name in DATASETS:
+        partitioned = is_partitioned(cur, table_name)
+        for year in years:
+            if table_name in CHANGE_RECORDERS:
+                loaded = f"(SELECT * FROM {table_name} WHERE file_year = {int(year)}) loaded"
+                cur.execute(CHANGE_RECORDERS[table_name].format(loaded=loaded))
+            if partitioned:
+                partition = partition_name(table_name, year)
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (partition,))
+                if cur.fetchone()[0]:
+                    print(f"Dropping partition {partition}...")
+                    cur.execute(f"ALTER TABLE {table_name} DETACH PARTITION {partition}")
+                    cur.execute(f"DROP TABLE {partition}")
+            else:
+                cur.execute(f"DELETE FROM {table_name} WHERE file_year = %s", (year,))
+                print(f"Deleted {cur.rowcount} rows from {table_name} for {year}")
+    cur.execute("SELECT to_regclass('postprocess_progress') IS NOT NULL")
+    if cur.fetchone()[0]:
+        cur.execute("DELETE FROM postprocess_progress WHERE file_year = ANY(%s)", (list(years),))
+    conn.commit()
+    cur.close()
+
+def prepare_bulk_load(conn):
+    """
+    Drop the primary keys of the dataset tables and create an empty UNLOGGED
+    staging table, without indexes, for each of them.
+    """
+    cur = conn.cursor()
+    for _, table_name in DATASETS:
+        cur.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", (table_name,))
+        for (constraint_name,) in cur.fetchall():
+            cur.execute(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint_name}")
+        staging = bulk_staging_table(table_name)
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        cur.execute(f"CREATE UNLOGGED TABLE {staging} (LIKE {table_name} INCLUDING DEFAULTS)")
+    conn.commit()
+    cur.close()
+
+def publish_bulk_table(table_name):
+    """
+    Move a bulk staging table's rows into its table, one partition per cycle
+    if it is partitioned, keeping one row per primary key. Then record the
+    loaded keys and drop the staging table.
+    """
+    staging = bulk_staging_table(table_name)
+    primary_key = ', '.join(extract_primary_key_from_sql(sql_file_path(table_name)))
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        if is_partitioned(cur, table_name):
+            cur.execute(f"SELECT DISTINCT file_year FROM {staging}")
+            file_years = sorted(row[0] for row in cur.fetchall())
+        else:
+            file_years = [None]
+
+        for year in file_years:
+            target = table_name if year is None else create_detached_partition(cur, table_name, year)
+            where = '' if year is None else f" WHERE file_year = {int(year)}"
+            if primary_key:
+                cur.execute(f"INSERT INTO {target} SELECT DISTINCT ON ({primary_key}) * FROM {staging}{where} "
+                            f"ORDER BY {primary_key}")
+            else:
+                cur.execute(f"INSERT INTO {target} SELECT * FROM {staging}{where}")
+            print(f"Published {cur.rowcount} rows into {target}")
+            if year is not None:
+                attach_partition(cur, table_name, year)
+
+        if table_name in CHANGE_RECORDERS:
+            cur.execute(CHANGE_RECORDERS[table_name].format(loaded=table_name))
+        cur.execute(f"DROP TABLE {staging}")
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+def bulk_index_statements(extensions):
+    """The dataset tables' primary keys followed by the query layer's indexes (see index_statements)."""
+    statements = []
+    for _, table_name in DATASETS:
+        primary_key = extract_primary_key_from_sql(sql_file_path(table_name))
+        if primary_key:
+            statements.append(f"ALTER TABLE {table_name} ADD PRIMARY KEY ({', '.join(primary_key)})")
+    return statements + index_statements(extensions)
+
+def run_statement(statement, maintenance_work_mem=None):
+    """Run one statement on its own connection, with maintenance_work_mem raised if given."""
+    start = time.perf_counter()
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        if maintenance_work_mem:
+            cur.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+        cur.execute(statement)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    print(f"{statement} ({time.perf_counter() - start:.1f}s)")
+
+def run_parallel(fn, args_list, workers):
+    with ThreadPoolExecutor(workers) as executor:
+        for future in [executor.submit(fn, *args) for args in args_list]:
+            future.result()
+
+def finish_bulk_load(conn, phases, workers=4, maintenance_work_mem='1GB'):
+    """Publish, index and analyze the tables loaded in bulk mode, timing each phase."""
+    tables = [table_name for _, table_name in DATASETS]
+    with timed_phase(phases, 'publish'):
+        run_parallel(publish_bulk_table, [(table_name,) for table_name in tables], workers)
+    with timed_phase(phases, 'index'):
+        statements = bulk_index_statements(create_extensions(conn))
+        run_parallel(run_statement, [(statement, maintenance_work_mem) for statement in statements], workers)
+    with timed_phase(phases, 'analyze'):
+        run_parallel(run_statement, [(f"ANALYZE {table_name}",) for table_name in tables], workers)
+
+class IteratorFile:
+    """Read-only binary file over an iterator of str or bytes blocks, for cursor.copy_expert."""
+
+    def __init__(self, blocks):
+        self._blocks = iter(blocks)
+        self._buffer = memoryview(b'')
+        self._offset = 0
+
+    def read(self, size=-1):
+        while self._offset >= len(self._buffer):
+            block = next(self._blocks, None)
+            if block is None:
+                return b''
+            if isinstance(block, str):
+                block = block.encode('utf-8')
+            self._buffer, self._offset = memoryview(block), 0
+        if size is None or size < 0:
+            size = len(self._buffer) - self._offset
+        data = self._buffer[self._offset:self._offset + size].tobytes()
+        self._offset += len(data)
+        return data
+
+def stream_years(years, workers=None, chunksize=None, bulk=False, output_format='csv', sync=False,
+                 source_directory=None, base_url=None):
+    """
+    Stream every dataset of every year into Postgres, one file per process.
+    Returns the total seconds spent, summed over files.
+    """
+    timings = {'stream': 0.0}
+    with ProcessPoolExecutor(workers) as streamers:
+        futures = [streamers.submit(timed, stream_dataset, fec_abbreviation, table_name, year, chunksize, bulk,
+                                    output_format, sync, source_directory, base_url)
+                   for year in years for fec_abbreviation, table_name in DATASETS]
+        try:
+            for future in futures:
+                timings['stream'] += future.result()
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+    return timings
+
+def load_years(years, download_workers=4, preprocess_workers=None, load_workers=4, chunksize=None, bulk=False,
+               engine='pandas', output_format='csv', sync=False, source_directory=None, base_url=None):
+    """
+    Run download -> preprocess -> load for every dataset of every year.
+    Returns the total seconds spent in each stage, summed over files.
+    """
+    timings = {'download': 0.0, 'preprocess': 0.0, 'load': 0.0}
+    with ThreadPoolExecutor(download_workers) as downloaders, \
+            ProcessPoolExecutor(preprocess_workers) as preprocessors, \
+            ThreadPoolExecutor(load_workers) as loaders:
+
+        def submit(stage, executor, fn, *args):
+            future = executor.submit(timed, fn, *args)
+            pending[future] = (stage, args)
+
+        pending = {}
+        for year in years:
+            for fec_abbreviation, table_name in DATASETS:
+                submit('download', downloaders, download_dataset, fec_abbreviation, table_name, year,
+                       source_directory, base_url)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, args = pending.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception:
+                    for other in pending:
+                        other.cancel()
+                    raise
+                timings[stage] += elapsed
+                if stage == 'download':
+                    _, table_name, year = args[:3]
+                    submit('preprocess', preprocessors, preprocess_dataset, table_name, year, chunksize, engine,
+                           output_format)
+                elif stage == 'preprocess':
+                    table_name, year = args[:2]
+                    submit('load', loaders, load_dataset, table_name, year, bulk, sync)
+    return timings
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+@contextlib.contextmanager
+def timed_phase(phases, phase):
+    """Record the wall-clock seconds spent in the with block under phases[phase]."""
+    start = time.perf_counter()
+    yield
+    phases[phase] = time.perf_counter() - start
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Download, preprocess and load FEC bulk data for the given cycles.")
+    parser.add_argument("years", nargs="+", type=int)
+    parser.add_argument("--append", action="store_true",
+                        help="Keep existing tables and load on top of them; run postprocess_data.py afterwards")
+    parser.add_argument("--replace", action="store_true",
+                        help="Drop the given cycles' existing rows before loading them again (implies --append)")
+    parser.add_argument("--sync", action="store_true",
+                        help="Update already loaded cycles in place, writing only the rows that changed "
+                             "(implies --append)")
+    parser.add_argument("--source-dir",
+                        help="Read raw files from SOURCE_DIR/<year>/<table>.txt instead of downloading them")
+    parser.add_argument("--base-url",
+                        help="Download from this mirror of the FEC bulk-downloads bucket "
+                             "(default: $FEC_BULK_URL or the FEC's S3 bucket)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Pipe each download through preprocessing straight into COPY, without data files")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Load into UNLOGGED staging tables and build keys and indexes once at the end")
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--preprocess-workers", type=int, default=os.cpu_count(),
+                        help="Processes used for preprocessing, or for whole files with --stream "
+                             "(default: one per core)")
+    parser.add_argument("--load-workers", type=int, default=4,
+                        help="Concurrent database connections used for loading")
+    parser.add_argument("--chunksize", type=int, default=int(os.environ.get("PREPROCESS_CHUNKSIZE", 0)) or None,
+                        help="Preprocess files in chunks of this many rows (default: $PREPROCESS_CHUNKSIZE)")
+    parser.add_argument("--preprocess-engine", choices=ENGINES, default=os.environ.get("PREPROCESS_ENGINE", "pandas"),
+                        help="CSV reader/writer used for preprocessing files; 'arrow' needs pyarrow "
+                             "(default: $PREPROCESS_ENGINE or pandas)")
+    parser.add_argument("--copy-format", choices=OUTPUT_FORMATS, default=os.environ.get("COPY_FORMAT", "csv"),
+                        help="Preprocess into pipe-delimited text or PostgreSQL binary COPY data "
+                             "(default: $COPY_FORMAT or csv)")
+    parser.add_argument("--index-workers", type=int, default=4,
+                        help="Concurrent connections building keys and indexes with --bulk")
+    parser.add_argument("--maintenance-work-mem", default="1GB",
+                        help="maintenance_work_mem for each index build with --bulk")
+    args = parser.parse_args()
+    if args.sync and args.replace:
+        parser.error("--sync updates cycles in place and can't be combined with --replace")
+    args.append = args.append or args.replace or args.sync
+    if args.bulk and args.append:
+        parser.error("--bulk loads into freshly created tables and can't be combined with --append, --replace "
+                     "or --sync")
+
+    years = []
+    for year in args.years:
+        if year % 2 == 0:
+            years.append(year)
+        else:
+            print(f"Skipping {year}: FEC data is indexed by federal election cycles, which occur every other year.")
+
+    phases = {}
+    start = time.perf_counter()
+    conn = connect()
+    with timed_phase(phases, 'create'):
+        create_tables(conn, drop=not args.append)
+        if args.bulk:
+            prepare_bulk_load(conn)
+        if args.replace:
+            replace_years(conn, years)
+
+    with timed_phase(phases, 'load'):
+        if args.stream:
+            timings = stream_years(years, args.preprocess_workers, args.chunksize, args.bulk, args.copy_format,
+                                   args.sync, args.source_dir, args.base_url)
+        else:
+            timings = load_years(years, args.download_workers, args.preprocess_workers, args.load_workers,
+                                 args.chunksize, args.bulk, args.preprocess_engine, args.copy_format, args.sync,
+                                 args.source_dir, args.base_url)
+
+    if args.bulk:
+        finish_bulk_load(conn, phases, args.index_workers, args.maintenance_work_mem)
+
+    with timed_phase(phases, 'refresh'):
+        print("Refreshing indexes and materialized views...")
+        refresh_query_layer(conn)
+        bump_data_version(conn)
+    conn.close()
+
+    for phase, seconds in phases.items():
+        print(f"{phase}: {seconds:.1f}s")
+    for stage, seconds in timings.items():
+        print(f"  {stage}: {seconds:.1f}s across files")
+    print(f"Loaded {len(years)} cycle(s) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
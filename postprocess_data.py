@@ -1,223 +1,239 @@
 
+import os
 import psycopg2
-import pandas as pd
-import datetime
-import requests
-import zipfile
-import io
-import xml.etree.ElementTree as ET
-
-def normalize_date(date_str):
-    print("date_str: ", date_str)
-    if pd.isnull(date_str) or len(str(date_str)) < 7:
-        return '2024-01-01'  # Default date for invalid or missing data
-    
-    date_str = str(int(float(date_str)))  # Handle the decimal and convert to string
-    year = date_str[-4:]
-    
-    if len(date_str) == 7:  # Assuming MDDYYYY format
-        month = date_str[:-6]
-        day = date_str[1:3]
-    elif len(date_str) == 8:  # Assuming MMDDYYYY format
-        month = date_str[:-6]
-        day = date_str[2:4]
-    else:
-        return '2024-01-01'  # Default date for any other unexpected format
-    
-    if len(month) < 2:
-        month = '0' + month  # Prepend 0 if month is a single digit
-    print(f'{year}-{month}-{day}')
-    return f'{year}-{month}-{day}'
-
-def calculate_metrics(conn):
+from query_layer import bump_data_version
+from grid_import import import_grid, download_grid, grid_url
+from batch_writes import batched_update
+
+SQL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql')
+
+# Server-side equivalent of fec_dates.parse_fec_dates: accepts MMDDYYYY and the
+# float-mangled MDDYYYY / MMDDYYYY.0 spellings, and returns NULL for anything
+# that isn't a real date instead of raising like to_date would.
+FEC_DATE_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION fec_date(raw text) RETURNS date
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE WHEN m BETWEEN 1 AND 12 AND y >= 1 THEN
+               CASE WHEN d BETWEEN 1 AND extract(day FROM make_date(y, m, 1) + interval '1 month - 1 day')
+                    THEN make_date(y, m, d)
+               END
+           END
+    FROM (
+        SELECT substr(digits, 1, 2)::int AS m, substr(digits, 3, 2)::int AS d, substr(digits, 5, 4)::int AS y
+        FROM (SELECT lpad(substring(raw FROM '^\s*(\d{7,8})(?:\.0*)?\s*$'), 8, '0') AS digits) raw_digits
+    ) parts
+$$;
+"""
+
+def create_postprocess_progress_table(conn):
     cur = conn.cursor()
-    # SQL query to calculate and update metrics
     cur.execute("""
-        WITH ranked_contributions AS (
-            SELECT
-                sub_id,
-                name,
-                zip_code,
-                formatted_transaction_dt,
-                transaction_amt,
-                LAG(formatted_transaction_dt) OVER (
-                    PARTITION BY name, zip_code ORDER BY formatted_transaction_dt
-                ) AS prev_transaction_dt
-            FROM individual_contributions
-        ),
-        periodicity_calculations AS (
-            SELECT
-                name,
-                zip_code,
-                sub_id,
-                formatted_transaction_dt,
-                transaction_amt,
-                prev_transaction_dt,
-                CASE 
-                    WHEN formatted_transaction_dt IS NOT NULL AND prev_transaction_dt IS NOT NULL THEN 
-                        (formatted_transaction_dt - prev_transaction_dt) 
-                    ELSE NULL
-                END AS periodicity_days
-            FROM ranked_contributions
-        ),
-        aggregated_metrics AS (
-            SELECT
-                pc.name,
-                pc.zip_code,
-                SUM(pc.transaction_amt) AS total_transaction_amt,
-                AVG(pc.periodicity_days) FILTER (WHERE pc.periodicity_days IS NOT NULL) AS average_periodicity,
-                ARRAY_AGG(pc.formatted_transaction_dt ORDER BY pc.formatted_transaction_dt) FILTER (WHERE pc.formatted_transaction_dt IS NOT NULL) AS transaction_dates
-            FROM periodicity_calculations pc
-            GROUP BY pc.name, pc.zip_code
-        )
-        UPDATE individual_contributions ic SET
-            total_transaction_amt = am.total_transaction_amt,
-            average_periodicity = am.average_periodicity,
-            transaction_dates = am.transaction_dates
-        FROM aggregated_metrics am
-        WHERE ic.name = am.name AND ic.zip_code = am.zip_code;
-
+        CREATE TABLE IF NOT EXISTS postprocess_progress (
+            step TEXT NOT NULL,
+            file_year INTEGER NOT NULL,
+            completed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (step, file_year)
+        );
     """)
+    conn.commit()
     cur.close()
 
-def convert_date_format(date_float_str):
+def pending_file_years(conn, step, table_name, file_years=None):
     """
-    Converts a date string from 'MDDYYYY.0' or 'MMDDYYYY.0' to 'YYYY-MM-DD' format.
+    Return the file_years of table_name that step hasn't completed yet.
+    If file_years is given, only those years are considered.
     """
-    if not date_float_str or date_float_str.lower() == 'null':
-        return None
+    create_postprocess_progress_table(conn)
+    cur = conn.cursor()
+    if file_years is None:
+        cur.execute(f"SELECT DISTINCT file_year FROM {table_name} WHERE file_year IS NOT NULL")
+        file_years = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT file_year FROM postprocess_progress WHERE step = %s", (step,))
+    completed = {row[0] for row in cur.fetchall()}
+    cur.close()
+    return sorted(int(year) for year in file_years if int(year) not in completed)
 
-    # Remove the decimal part and zero-pad the string to ensure it's at least 8 characters long
-    date_str = str(int(float(date_float_str))).zfill(7)  # Ensure at least 7 digits for MDDYYYY
-    
-    # Correctly format the string to 'MMDDYYYY' by zero-padding
-    if len(date_str) == 7:  # MDDYYYY
-        date_str = '0' + date_str  # Zero-pad month
-    
-    # Parse the date
-    # date_obj = datetime.strptime(date_str, '%m%d%Y')
-    date_obj = datetime.datetime.strptime(date_str, '%m%d%Y')
-    
-    # Convert to 'YYYY-MM-DD' format
-    return date_obj.strftime('%Y-%m-%d')
+def mark_file_year_completed(cur, step, file_year):
+    cur.execute("""
+        INSERT INTO postprocess_progress (step, file_year) VALUES (%s, %s)
+        ON CONFLICT (step, file_year) DO UPDATE SET completed_at = now();
+    """, (step, file_year))
 
-def update_formatted_transaction_dt(conn):
+def update_formatted_transaction_dt(conn, file_years=None, force=False, batch_size=100000,
+                                    commit_interval=1000000):
     """
-    Fetches each transaction_dt, converts it to the correct date format, 
-    and updates the formatted_transaction_dt in the database.
+    Backfill formatted_transaction_dt from transaction_dt with set-based
+    UPDATEs run entirely inside Postgres, over batch_size sub_id ranges of
+    each file_year and committed every commit_interval rows.
+
+    A year is marked completed in postprocess_progress once all of its batches
+    are in, so an interrupted run picks up at the first unfinished year (rows
+    already updated are skipped). Pass force=True to redo years that were
+    already completed.
     """
-    # Connect to the database
     cur = conn.cursor()
+    cur.execute(FEC_DATE_FUNCTION)
+    conn.commit()
 
-    # Fetch transaction_dt values
-    cur.execute("SELECT sub_id, transaction_dt FROM individual_contributions WHERE transaction_dt IS NOT NULL AND transaction_dt != 'NULL'")
-    rows = cur.fetchall()
+    if force:
+        create_postprocess_progress_table(conn)
+        cur.execute("DELETE FROM postprocess_progress WHERE step = 'formatted_transaction_dt'")
+        conn.commit()
+
+    for file_year in pending_file_years(conn, 'formatted_transaction_dt', 'individual_contributions', file_years):
+        updated = batched_update(conn, 'individual_contributions', 'sub_id', """
+            UPDATE individual_contributions
+            SET formatted_transaction_dt = fec_date(transaction_dt)
+            WHERE {key_range}
+              AND formatted_transaction_dt IS DISTINCT FROM fec_date(transaction_dt);
+        """, {'file_year': file_year}, where='file_year = %(file_year)s', batch_size=batch_size,
+            commit_interval=commit_interval, progress_interval=commit_interval,
+            label=f"formatted_transaction_dt {file_year}")
+        print(f"Updated formatted_transaction_dt on {updated} rows for {file_year}")
+        mark_file_year_completed(cur, 'formatted_transaction_dt', file_year)
+        conn.commit()
 
-    # Prepare update query
-    update_query = "UPDATE individual_contributions SET formatted_transaction_dt = %s WHERE sub_id = %s"
+    cur.close()
     
-    # Process and update each row
-    for sub_id, transaction_dt in rows:
-        # Convert the date format
-        formatted_date = convert_date_format(transaction_dt)
-        if formatted_date:  # Proceed only if conversion was successful
-            cur.execute(update_query, (formatted_date, sub_id))
-            print(f"Updated sub_id {sub_id}: {transaction_dt} -> {formatted_date}")
-
-    # Commit the changes and close the connection
+def execute_sql_file(conn, file_name):
+    """Run one of the CREATE TABLE IF NOT EXISTS definitions in sql/."""
+    cur = conn.cursor()
+    with open(os.path.join(SQL_DIRECTORY, file_name)) as f:
+        cur.execute(f.read())
     conn.commit()
     cur.close()
-    
-def calculate_transaction_dates(conn):
+
+def create_donor_summary_table(conn):
+    execute_sql_file(conn, 'donor_summary.sql')
+
+def create_load_changes_tables(conn):
+    execute_sql_file(conn, 'load_changes.sql')
+
+def build_donor_summary(conn, file_years=None, incremental=False):
+    """
+    Rebuild donor_summary from individual_contributions in one aggregation pass.
+
+    LAG() over (name, zip_code) supplies the gaps for average_periodicity while
+    the same GROUP BY produces the totals and date/amount arrays, so each donor
+    is read once and written once. Without arguments the whole table is
+    rebuilt. With file_years only donors with contributions in those years are
+    replaced, and with incremental=True only the donors the loader recorded in
+    changed_donors (which are then cleared); either way they are recomputed
+    over their full history.
+    """
+    create_donor_summary_table(conn)
+    create_load_changes_tables(conn)
     cur = conn.cursor()
 
-    # Use SQL to aggregate transaction dates and amounts, and update them in a single operation
-    cur.execute("""
-    WITH contributions_agg AS (
+    if incremental:
+        cur.execute("""
+            CREATE TEMP TABLE touched_donors ON COMMIT DROP AS
+            SELECT name, zip_code FROM changed_donors
+        """)
+        cur.execute("DELETE FROM donor_summary ds USING touched_donors td WHERE ds.name = td.name AND ds.zip_code = td.zip_code")
+        cur.execute("DELETE FROM changed_donors cd USING touched_donors td WHERE cd.name = td.name AND cd.zip_code = td.zip_code")
+        donor_filter = "JOIN touched_donors USING (name, zip_code)"
+    elif file_years is None:
+        cur.execute("TRUNCATE donor_summary, changed_donors")
+        donor_filter = ""
+    else:
+        cur.execute("""
+            CREATE TEMP TABLE touched_donors ON COMMIT DROP AS
+            SELECT DISTINCT name, zip_code
+            FROM individual_contributions
+            WHERE file_year = ANY(%s)
+        """, ([int(year) for year in file_years],))
+        cur.execute("DELETE FROM donor_summary ds USING touched_donors td WHERE ds.name = td.name AND ds.zip_code = td.zip_code")
+        donor_filter = "JOIN touched_donors USING (name, zip_code)"
+
+    cur.execute(f"""
+        INSERT INTO donor_summary (
+            name, zip_code, contribution_count, total_transaction_amt, average_periodicity,
+            first_transaction_dt, last_transaction_dt, transaction_dates, transaction_amounts, file_years
+        )
         SELECT
             name,
             zip_code,
-            ARRAY_AGG(formatted_transaction_dt ORDER BY formatted_transaction_dt) AS transaction_dates,
-            ARRAY_AGG(transaction_amt ORDER BY formatted_transaction_dt) AS transaction_amounts
-        FROM individual_contributions
-        GROUP BY name, zip_code
-    )
-    UPDATE individual_contributions ic
-    SET
-        transaction_dates = ca.transaction_dates,
-        transaction_amounts = ca.transaction_amounts
-    FROM contributions_agg ca
-    WHERE ic.name = ca.name AND ic.zip_code = ca.zip_code;
+            COUNT(*),
+            SUM(transaction_amt),
+            AVG(gap),
+            MIN(formatted_transaction_dt),
+            MAX(formatted_transaction_dt),
+            ARRAY_AGG(formatted_transaction_dt ORDER BY formatted_transaction_dt) FILTER (WHERE formatted_transaction_dt IS NOT NULL),
+            ARRAY_AGG(transaction_amt ORDER BY formatted_transaction_dt) FILTER (WHERE formatted_transaction_dt IS NOT NULL),
+            ARRAY_AGG(DISTINCT file_year)
+        FROM (
+            SELECT
+                name,
+                zip_code,
+                file_year,
+                transaction_amt,
+                formatted_transaction_dt,
+                formatted_transaction_dt - LAG(formatted_transaction_dt) OVER (
+                    PARTITION BY name, zip_code ORDER BY formatted_transaction_dt
+                ) AS gap
+            FROM individual_contributions
+            {donor_filter}
+            WHERE name IS NOT NULL AND zip_code IS NOT NULL
+        ) contributions
+        GROUP BY name, zip_code;
     """)
-
+    print(f"Wrote {cur.rowcount} donor_summary rows")
     conn.commit()
-
-def calculate_periodicity(conn):
-    sql_command = """
-    DO $$
-    DECLARE
-        rec record;
-    BEGIN
-        FOR rec IN (SELECT sub_id, transaction_dates FROM individual_contributions WHERE cardinality(transaction_dates) > 1)
-        LOOP
-            UPDATE individual_contributions ic SET periodicity = sub.avg_periodicity
-            FROM (
-                SELECT avg(diff) as avg_periodicity
-                FROM (
-                    SELECT sub_id, dt, lead(dt) OVER (ORDER BY dt) - dt as diff
-                    FROM (
-                        SELECT sub_id, unnest(transaction_dates) as dt
-                        FROM individual_contributions
-                        WHERE sub_id = rec.sub_id
-                    ) s1
-                ) s2
-                WHERE diff IS NOT NULL
-            ) sub
-            WHERE ic.sub_id = rec.sub_id;
-        END LOOP;
-    END $$;
+    cur.close()
+    
+def set_committee_totals(conn, incremental=False):
     """
-
+    Set candidate_committee_linkages.committee_total to the sum of each
+    committee's committee_transactions. With incremental=True only the
+    committees the loader recorded in changed_committees are recomputed (and
+    then cleared).
+    """
+    create_load_changes_tables(conn)
     cur = conn.cursor()
-    cur.execute(sql_command)
-    conn.commit()
-    
-def set_committee_totals(conn):
+
     # First, add the new column if it doesn't exist
-    add_column_command = """
-    DO $$
-    BEGIN
-        IF NOT EXISTS (
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name='candidate_committee_linkages' AND column_name='committee_total'
-        ) THEN
-            ALTER TABLE candidate_committee_linkages ADD COLUMN committee_total NUMERIC;
-        END IF;
-    END $$;
-    """
-    
+    cur.execute("ALTER TABLE candidate_committee_linkages ADD COLUMN IF NOT EXISTS committee_total NUMERIC;")
+
+    committee_filter = ""
+    if incremental:
+        cur.execute("""
+            CREATE TEMP TABLE touched_committees ON COMMIT DROP AS
+            SELECT cmte_id FROM changed_committees
+        """)
+        cur.execute("DELETE FROM changed_committees cc USING touched_committees tc WHERE cc.cmte_id = tc.cmte_id")
+        committee_filter = "WHERE cmte_id IN (SELECT cmte_id FROM touched_committees)"
+    else:
+        cur.execute("TRUNCATE changed_committees")
+
     # Then, update the committee_total column with the sum of transaction amounts
-    update_totals_command = """
-    DO $$
-    BEGIN
+    cur.execute(f"""
         UPDATE candidate_committee_linkages ccl
         SET committee_total = ct.total_amt
         FROM (
             SELECT cmte_id, SUM(transaction_amt) AS total_amt
             FROM committee_transactions
+            {committee_filter}
             GROUP BY cmte_id
         ) ct
         WHERE ccl.cmte_id = ct.cmte_id;
-    END $$;
+    """)
+    print(f"Updated committee_total on {cur.rowcount} linkages")
+    conn.commit()
+    cur.close()
+
+def postprocess(conn, full=False):
     """
+    Bring the derived columns and tables up to date after a load.
 
-    cur = conn.cursor()
-    # Execute the command to add the column if it doesn't exist
-    cur.execute(add_column_command)
-    # Execute the command to update totals
-    cur.execute(update_totals_command)
-    conn.commit()
+    By default this is incremental: dates are backfilled only for file_years
+    not yet processed, and donor/committee aggregates only for the keys the
+    loader recorded in changed_donors/changed_committees. full=True redoes
+    everything from scratch.
+    """
+    update_formatted_transaction_dt(conn, force=full)
+    build_donor_summary(conn, incremental=not full)
+    set_committee_totals(conn, incremental=not full)
     
 def create_committee_grid_table(conn):
     cur = conn.cursor()
@@ -258,93 +274,27 @@ def create_candidate_grid_table(conn):
     conn.commit()
     cur.close()
 
-def download_and_import_committee_grid(conn, year):
-    # Download ZIP file
-    url = f"https://cg-519a459a-0ea3-42c2-b7bc-fa1143481f74.s3-us-gov-west-1.amazonaws.com/bulk-downloads/{year}/committee_summary_grid{year}.zip"
-    response = requests.get(url)
-    zip_file = zipfile.ZipFile(io.BytesIO(response.content))
-    
-    # Extract XML file from ZIP archive
-    zip_file.extractall("/tmp")  # Extract to /tmp directory or change as needed
-
-    # Assuming there's only one XML file in the ZIP
-    xml_file_name = zip_file.namelist()[0]
-    xml_path = f"/tmp/{xml_file_name}"
-
-    # Parse XML file
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    # Connect to PostgreSQL database and insert data
-    cursor = conn.cursor()
-
-    for com_sum in root.findall('com_sum'):
-        com_nam = com_sum.find('com_nam').text
-        com_id = com_sum.find('com_id').text
-        com_typ = com_sum.find('com_typ').text if com_sum.find('com_typ') is not None else None
-        com_des = com_sum.find('com_des').text if com_sum.find('com_des') is not None else None
-        org_tp = com_sum.find('org_tp').text if com_sum.find('org_tp') is not None else None
-        tot_rec = float(com_sum.find('tot_rec').text) if com_sum.find('tot_rec') is not None and com_sum.find('tot_rec').text is not None else 0
-        tot_dis = float(com_sum.find('tot_dis').text) if com_sum.find('tot_dis') is not None and com_sum.find('tot_dis').text is not None else 0
-        cas_on_han_clo_of_per = float(com_sum.find('cas_on_han_clo_of_per').text) if com_sum.find('cas_on_han_clo_of_per') is not None and com_sum.find('cas_on_han_clo_of_per').text is not None else 0
-        cov_end_dat = com_sum.find('cov_end_dat').text if com_sum.find('cov_end_dat') is not None else None
-
-
-        # Insert data into your database
-        # Ensure you have created a table with the appropriate schema to store this data
-        cursor.execute("""
-            INSERT INTO committee_grid (com_nam, com_id, com_typ, com_des, org_tp, tot_rec, tot_dis, cas_on_han_clo_of_per, cov_end_dat)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (com_id) DO NOTHING;  -- Assuming com_id is a unique identifier
-        """, (com_nam, com_id, com_typ, com_des, org_tp, tot_rec, tot_dis, cas_on_han_clo_of_per, cov_end_dat))
-
-    # Commit the transaction and close the cursor
-    conn.commit()
-    cursor.close()
+def download_and_import_grid(conn, table_name, year, source=None, base_url=None):
+    """
+    Import the summary grid for year into table_name.
 
-def download_and_import_candidate_grid(conn, year):
-    # Download ZIP file
-    url = f"https://cg-519a459a-0ea3-42c2-b7bc-fa1143481f74.s3-us-gov-west-1.amazonaws.com/bulk-downloads/{year}/candidate_summary_grid{year}.zip"
-    response = requests.get(url)
-    zip_file = zipfile.ZipFile(io.BytesIO(response.content))
-    
-    # Extract XML file from ZIP archive
-    zip_file.extractall("/tmp")  # Extract to /tmp directory or change as needed
-
-    # Assuming there's only one XML file in the ZIP
-    xml_file_name = zip_file.namelist()[0]
-    xml_path = f"/tmp/{xml_file_name}"
-
-    # Parse XML file
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    # Connect to PostgreSQL database and insert data
-    cursor = conn.cursor()
-
-    for candidate in root.findall('candidate'):
-        # Extract data for each candidate
-        can_nam = candidate.find('can_nam').text
-        lin_ima = candidate.find('lin_ima').text if candidate.find('lin_ima') is not None else None
-        can_off = candidate.find('can_off').text if candidate.find('can_off') is not None else None
-        can_off_sta = candidate.find('can_off_sta').text if candidate.find('can_off_sta') is not None else None
-        can_off_dis = candidate.find('can_off_dis').text if candidate.find('can_off_dis') is not None else None
-        can_par_aff = candidate.find('can_par_aff').text if candidate.find('can_par_aff') is not None else None
-        can_inc_cha_ope_sea = candidate.find('can_inc_cha_ope_sea').text if candidate.find('can_inc_cha_ope_sea') is not None else None
-        tot_rec = float(candidate.find('tot_rec').text) if candidate.find('tot_rec') is not None and candidate.find('tot_rec').text is not None else 0
-        tot_dis = float(candidate.find('tot_dis').text) if candidate.find('tot_dis') is not None and candidate.find('tot_dis').text is not None else 0
-        cas_on_han_clo_of_per = float(candidate.find('cas_on_han_clo_of_per').text) if candidate.find('cas_on_han_clo_of_per') is not None and candidate.find('cas_on_han_clo_of_per').text is not None else 0
-        deb_owe_by_com = float(candidate.find('deb_owe_by_com').text) if candidate.find('deb_owe_by_com') is not None and candidate.find('deb_owe_by_com').text is not None else 0
-        cov_end_dat = candidate.find('cov_end_dat').text if candidate.find('cov_end_dat') is not None else None
-
-        # Insert data into your database
-        cursor.execute("""
-            INSERT INTO candidate_grid (can_nam, lin_ima, can_off, can_off_sta, can_off_dis, can_par_aff, can_inc_cha_ope_sea, tot_rec, tot_dis, cas_on_han_clo_of_per, deb_owe_by_com, cov_end_dat)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (can_nam, lin_ima, can_off, can_off_sta, can_off_dis, can_par_aff, can_inc_cha_ope_sea, tot_rec, tot_dis, cas_on_han_clo_of_per, deb_owe_by_com, cov_end_dat))
-    
-    conn.commit()
-    cursor.close()
+    Parameters:
+    - conn: A connection object to the PostgreSQL database.
+    - table_name: 'committee_grid' or 'candidate_grid'.
+    - year: Election cycle of the grid.
+    - source: Optional local path or file object for the grid ZIP; downloaded when not given.
+    - base_url: Mirror to download from instead of fec_download.BASE_URL.
+    """
+    if source is not None:
+        return import_grid(conn, table_name, source)
+    with download_grid(grid_url(table_name, year, base_url)) as archive:
+        return import_grid(conn, table_name, archive)
+
+def download_and_import_committee_grid(conn, year, source=None, base_url=None):
+    return download_and_import_grid(conn, 'committee_grid', year, source, base_url)
+
+def download_and_import_candidate_grid(conn, year, source=None, base_url=None):
+    return download_and_import_grid(conn, 'candidate_grid', year, source, base_url)
 
 def drop_table(conn, table_name):
     """
@@ -377,6 +327,15 @@ def drop_table(conn, table_name):
             cur.close()
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Build derived FEC tables after a load.")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild every aggregate instead of only those touched by the last load")
+    parser.add_argument("--base-url",
+                        help="Download the grids from this mirror of the FEC bulk-downloads bucket "
+                             "(default: $FEC_BULK_URL or the FEC's S3 bucket)")
+    args = parser.parse_args()
+
     # Database connection details
     db_name = "fec_data"
     db_user = "postgres"
@@ -385,21 +344,18 @@ def main():
     # Connect to the database
     conn = psycopg2.connect(dbname=db_name, user=db_user, password=db_password)
 
-    # Normalize and Update Dates - Implement the normalization and update here
-    # This would use the normalize_date function and execute_batch for updates
+    # Normalize and update dates, then the donor and committee aggregates
+    postprocess(conn, full=args.full)
 
-    # After updating the dates, calculate additional metrics
-    # calculate_metrics(conn)
-    # update_formatted_transaction_dt(conn)
-    # calculate_transaction_dates(conn)
-    # calculate_periodicity(conn)
-    # set_committee_totals(conn)
     drop_table(conn, 'committee_grid')
     create_committee_grid_table(conn)
-    download_and_import_committee_grid(conn, 2024)
+    download_and_import_committee_grid(conn, 2024, base_url=args.base_url)
     drop_table(conn, 'candidate_grid')
     create_candidate_grid_table(conn)
-    download_and_import_candidate_grid(conn, 2024)
+    download_and_import_candidate_grid(conn, 2024, base_url=args.base_url)
+
+    # Derived tables changed, so cached API responses are stale
+    bump_data_version(conn)
 
     # Commit changes and close the connection
     # conn.commit()
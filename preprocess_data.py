@@ -1,194 +1,358 @@
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-import pgeocode
-from collections.abc import Iterable
-import datetime
-
-def preprocess_file(data_file_path, sql_file_path, year, tablename):
-    column_names = extract_column_names_from_sql(sql_file_path)
-    if 'file_year' not in column_names:
-        column_names.extend(['file_year', 'recurring_contributions', 'periodicity', 'formatted_transaction_dt'])
-
-    df = pd.read_csv(data_file_path, delimiter='|', header=None, low_memory=False)
-    df = df.iloc[:, :len(column_names)]
-    df.columns = column_names[:len(df.columns)]
-
-    nomi = pgeocode.Nominatim('us')
-    lat_cache, lon_cache = {}, {}
-    apply_geocoding(df, 'cand_zip', lat_cache, lon_cache, nomi)
-    apply_geocoding(df, 'zip_code', lat_cache, lon_cache, nomi, donor=True)
-    print("Table name: ", tablename)
-    if tablename == 'individual_contributions.txt':
-        print("Processing individual contributions")
-        # Normalize and format transaction_dt
-        df['formatted_transaction_dt'] = df['transaction_dt'].apply(normalize_date)
+from fec_dates import parse_fec_dates
+from zip_centroids import geocode_zip_codes
+import pg_binary_copy
 
-        # Calculate recurring contributions and periodicity
-        df = calculate_recurring_contributions_for_testing(df)
+# Low-cardinality code columns, read as categoricals
+CATEGORICAL_COLUMNS = {
+    'amndt_ind', 'rpt_tp', 'transaction_pgi', 'transaction_tp', 'entity_tp', 'state', 'memo_cd',
+    'line_num', 'form_tp_cd', 'sched_tp_cd', 'category', 'cmte_st', 'cmte_dsgn', 'cmte_tp',
+    'cmte_pty_affiliation', 'cmte_filing_freq', 'org_tp', 'cand_pty_affiliation', 'pty_cd',
+    'cand_office', 'cand_office_st', 'cand_ici', 'cand_status', 'cand_st',
+}
 
-    df['file_year'] = year
-    df.to_csv(data_file_path, index=False, sep='|')
-
-def normalize_date(date_str):
-    print("date_str: ", date_str)
-    if pd.isnull(date_str) or len(str(date_str)) < 7:
-        return '2024-01-01'  # Default date for invalid or missing data
-    
-    date_str = str(int(float(date_str)))  # Handle the decimal and convert to string
-    year = date_str[-4:]
-    
-    if len(date_str) == 7:  # Assuming MDDYYYY format
-        month = date_str[:-6]
-        day = date_str[1:3]
-    elif len(date_str) == 8:  # Assuming MMDDYYYY format
-        month = date_str[:-6]
-        day = date_str[2:4]
+# column_dtype results parsed by convert_numeric_columns rather than by the CSV reader
+NUMERIC_DTYPES = ('float64', 'Int64')
+
+INTEGER_TYPES = ('integer', 'int', 'bigint', 'smallint')
+DECIMAL_TYPES = ('numeric', 'decimal', 'real', 'double')
+
+# Identifiers declared NUMERIC/INTEGER whose values must be passed through digit for digit
+# (sub_id has 19 digits, more than a float holds)
+IDENTIFIER_COLUMNS = {'sub_id', 'file_num', 'linkage_id'}
+
+# Floats are written with at most 15 significant digits, so amounts read as
+# float64 are written back as they appeared (100, not 100.0)
+FLOAT_FORMAT = '%.15g'
+
+# CSV engines preprocess_file can parse and write with. 'arrow' uses pyarrow.csv,
+# which parses with all cores and writes several times faster than pandas.
+ENGINES = ('pandas', 'arrow')
+
+# Bytes per record batch when the arrow engine streams a file (chunksize set)
+ARROW_BLOCK_SIZE = 64 << 20
+
+# Rows per slice the arrow engine serializes on each writer thread
+ARROW_WRITE_ROWS = 100000
+
+# Output formats: pipe-delimited text for COPY ... FORMAT CSV, or binary COPY data
+OUTPUT_FORMATS = ('csv', 'binary')
+
+def preprocess_file(data_file_path, sql_file_path, year, tablename, chunksize=None, output_path=None,
+                    engine='pandas', output_format='csv'):
+    """
+    Preprocess a raw FEC bulk file into the layout expected by its table.
+
+    By default the whole file is read into memory and rewritten in place. When
+    chunksize is given the file is streamed in chunks of that many rows, so peak
+    memory is bounded by the chunk size rather than by the file size; the output
+    is byte-identical to the in-memory mode. Output goes to output_path, or
+    replaces the input file once it has been fully written.
+
+    engine selects the CSV reader and writer (see ENGINES and read_frames_arrow).
+    output_format 'binary' writes PostgreSQL binary COPY data instead of
+    pipe-delimited text (see pg_binary_copy).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown CSV engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {', '.join(OUTPUT_FORMATS)}")
+
+    # Every table's SQL also declares the columns preprocessing adds (file_year, formatted_transaction_dt, ...)
+    columns = extract_columns_from_sql(sql_file_path)
+
+    if engine == 'arrow':
+        frames = read_frames_arrow(data_file_path, columns, chunksize)
     else:
-        return '2024-01-01'  # Default date for any other unexpected format
-    
-    if len(month) < 2:
-        month = '0' + month  # Prepend 0 if month is a single digit
-    print(f'{year}-{month}-{day}')
-    return f'{year}-{month}-{day}'
-
-
-def is_iterable(obj):
-    return isinstance(obj, Iterable) and not isinstance(obj, str)
-
-def format_dates_for_sql(date_list):
-    """
-    Convert a list of dates to a string formatted as a PostgreSQL DATE[] array.
-    Handles cases where date_list is not iterable (e.g., NaN or float).
-    """
-    if not is_iterable(date_list):
-        # Handle non-iterable inputs gracefully; return an empty array representation
-        return '{}'
-
-    # Convert each date to a string in 'YYYY-MM-DD' format
-    date_strs = [date.strftime('%Y-%m-%d') for date in date_list]
-    # Format as a PostgreSQL array
-    return "{" + ",".join(date_strs) + "}"
-
-
-def calculate_recurring_contributions(df):
-    # Ensure the 'transaction_dt' is in the correct datetime format
-    df['formatted_transaction_dt'] = pd.to_datetime(df['formatted_transaction_dt'], errors='coerce')
-    
-    # Sort by name, zip_code, and formatted_transaction_dt
-    df.sort_values(by=['name', 'zip_code', 'formatted_transaction_dt'], inplace=True)
-    
-    # Calculate gaps in contributions for periodicity
-    df['prev_transaction_dt'] = df.groupby(['name', 'zip_code'])['formatted_transaction_dt'].shift(1)
-    df['periodicity'] = (df['formatted_transaction_dt'] - df['prev_transaction_dt']).dt.days.fillna(0).astype(int)
-    
-    # Aggregate recurring dates and amounts
-    agg_funcs = {
-        'formatted_transaction_dt': lambda x: list(x),  # Corrected to aggregate dates into a list
-        'transaction_amt': ['sum', lambda x: list(x)],  # Sum and list of transaction amounts
-        'periodicity': 'mean',  # Average periodicity
-    }
-    df_agg = df.groupby(['name', 'zip_code']).agg(agg_funcs).reset_index()
-
-    # Flatten MultiIndex columns resulting from aggregation
-    df_agg.columns = ['_'.join(col).rstrip('_') if col[1] else col[0] for col in df_agg.columns.values]
-
-    # Rename columns to reflect the aggregated data
-    df_agg.rename(columns={
-        'formatted_transaction_dt_<lambda>': 'transaction_dates',
-        'transaction_amt_sum': 'total_transaction_amt',
-        'transaction_amt_<lambda_0>': 'transaction_amounts',
-        'periodicity_mean': 'average_periodicity',
-    }, inplace=True)
-    
-    df_agg['transaction_amounts'] = df_agg['transaction_amounts'].apply(lambda x: '{' + ','.join(map(str, x)) + '}')
-
-    
-    # Merge the aggregated data back with the original dataframe on 'name' and 'zip_code'
-    df_merged = pd.merge(df, df_agg, on=['name', 'zip_code'], how='left')
-
-    # Apply format_dates_for_sql if 'transaction_dates' exists
-    if 'transaction_dates' in df_merged.columns:
-        df_merged['transaction_dates'] = df_merged['transaction_dates'].apply(format_dates_for_sql)
+        frames = pd.read_csv(data_file_path, delimiter='|', header=None, dtype=column_dtypes(columns),
+                             chunksize=chunksize)
+        if not chunksize:
+            frames = [frames]
+    frames = (transform_frame(frame, columns, year, tablename) for frame in frames)
+
+    target_path = output_path or data_file_path + '.tmp'
+    with open(target_path, 'wb') as out:
+        if output_format == 'binary':
+            for block in pg_binary_copy.iter_copy_data(frames, dict(columns)):
+                out.write(block)
+        else:
+            for i, frame in enumerate(frames):
+                if engine == 'arrow':
+                    write_frame_arrow(frame, out, header=(i == 0))
+                else:
+                    frame.to_csv(out, index=False, sep='|', header=(i == 0), float_format=FLOAT_FORMAT)
+
+    if output_path is None:
+        os.replace(target_path, data_file_path)
+
+def read_frames_arrow(data_file_path, columns, chunksize=None):
+    """
+    Parse a raw file with pyarrow.csv on all cores, using the DDL-derived
+    column types, and yield it as pandas frames like pd.read_csv would.
+
+    Without chunksize the whole file is read at once. With it the file is
+    streamed in record batches of ARROW_BLOCK_SIZE bytes instead; Arrow sizes
+    batches in bytes, so chunksize only selects streaming.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    # Arrow needs the column count up front; like pandas, take it from the first line
+    with open(data_file_path, 'rb') as f:
+        column_count = f.readline().count(b'|') + 1
+    read_options = pa_csv.ReadOptions(column_names=[str(i) for i in range(column_count)],
+                                      block_size=ARROW_BLOCK_SIZE if chunksize else None)
+    parse_options = pa_csv.ParseOptions(delimiter='|')
+    convert_options = pa_csv.ConvertOptions(column_types=arrow_column_types(columns[:column_count]),
+                                            strings_can_be_null=True)
+
+    if chunksize:
+        reader = pa_csv.open_csv(data_file_path, read_options, parse_options, convert_options)
+        tables = (pa.Table.from_batches([batch]) for batch in reader)
     else:
-        print("Error: 'transaction_dates' column not found.")
-    
-    # Drop temporary column
-    df_merged.drop(columns=['prev_transaction_dt'], inplace=True)
-    
-    return df_merged
+        tables = [pa_csv.read_csv(data_file_path, read_options, parse_options, convert_options)]
 
-def calculate_recurring_contributions_for_testing(df):
-    # Setting a specific date for the date fields
-    specific_date = datetime.date(2020, 1, 1)
+    for table in tables:
+        frame = table.to_pandas()
+        frame.columns = range(len(frame.columns))
+        yield frame
 
-    # Assign default values directly for scalar types
-    df['formatted_transaction_dt'] = specific_date
-    df['periodicity'] = 0
-    df['total_transaction_amt'] = 0.0
-    df['average_periodicity'] = 0.0
+def arrow_column_types(columns):
+    """The pyarrow equivalents of column_dtypes, keyed by column position."""
+    import pyarrow as pa
+    arrow_types = {'category': pa.dictionary(pa.int32(), pa.string()), str: pa.string()}
+    return {str(position): arrow_types[dtype] for position, dtype in column_dtypes(columns).items()}
+
+def write_frame_arrow(df, out, header=True):
+    """
+    Write df to the binary file out as pipe-delimited text, in slices of
+    ARROW_WRITE_ROWS rows serialized on a thread pool (Arrow releases the GIL)
+    and written in order.
 
-    # Assuming df is your existing DataFrame and you've already done other necessary operations on it
-    df['transaction_dates'] = '{}'
+    COPY reads these files with QUOTE E'\\b', i.e. without quoting, so values
+    are written unquoted. Arrow refuses to write a value containing the
+    delimiter, a double quote or a line break that way; a slice with such a
+    value is written by pandas instead, exactly as the pandas engine would.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
 
-    df['transaction_amounts'] = '{}'
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        # Dates come out of transform_frame as timestamps; write them as YYYY-MM-DD
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+        # Arrow writes the shortest repr of a float; write FLOAT_FORMAT like pandas does
+        elif pa.types.is_floating(field.type):
+            values = df.iloc[:, i].to_numpy(dtype=np.float64, na_value=np.nan)
+            table = table.set_column(i, field.name, pa.array(format_floats(values), pa.string()))
 
-    return df
+    def serialize(offset):
+        buffer = io.BytesIO()
+        try:
+            pa_csv.write_csv(table.slice(offset, ARROW_WRITE_ROWS), buffer,
+                             pa_csv.WriteOptions(include_header=False, delimiter='|', quoting_style='none'))
+        except pa.ArrowInvalid:
+            return df.iloc[offset:offset + ARROW_WRITE_ROWS].to_csv(
+                index=False, sep='|', header=False, float_format=FLOAT_FORMAT).encode()
+        return buffer.getvalue()
 
-def calculate_periodicity(df):
-    # Assuming 'name' is the contributor's name and 'transaction_dt' is the transaction date
-    df['transaction_dt'] = pd.to_datetime(df['transaction_dt'])
-    df.sort_values(by=['name', 'transaction_dt'], inplace=True)
+    # Arrow quotes header names, so the header line is written here
+    if header:
+        out.write(('|'.join(map(str, df.columns)) + '\n').encode())
+    with ThreadPoolExecutor(os.cpu_count()) as writers:
+        for data in writers.map(serialize, range(0, max(len(table), 1), ARROW_WRITE_ROWS)):
+            out.write(data)
 
-    # Calculate the difference in days between consecutive contributions for each contributor
-    df['periodicity'] = df.groupby('name')['transaction_dt'].diff().dt.days
+def format_floats(values):
+    """A float array as FLOAT_FORMAT strings, as DataFrame.to_csv writes them, with None for NaN."""
+    present = ~np.isnan(values)
+    text = np.full(len(values), None, dtype=object)
+    text[present] = [FLOAT_FORMAT % value for value in values[present].tolist()]
+    return text
 
-    # Fill NaN values with a default value or leave as is based on your requirements
-    df['periodicity'] = df['periodicity'].fillna(0)  
+def preprocess_stream(source, sql_file_path, year, tablename, chunksize=100000, output_format='csv'):
+    """
+    Preprocess a raw FEC bulk file read from source (a path or binary file object,
+    e.g. a download pipe) and yield the output as text: the header line first,
+    then one block of rows per chunk. Nothing is yielded for an empty input.
 
-def apply_geocoding(df, column_name, lat_cache, lon_cache, nomi, donor=False):
-    if column_name in df.columns:
-        df[f'{"donor_" if donor else "candidate_"}latitude'] = df[column_name].apply(lambda z: geocode(z, lat_cache, nomi))
-        df[f'{"donor_" if donor else "candidate_"}longitude'] = df[column_name].apply(lambda z: geocode(z, lon_cache, nomi, lat=False))
+    With output_format 'binary' the blocks are bytes of a binary COPY stream
+    instead, starting with its header (which names the columns).
+    """
+    columns = extract_columns_from_sql(sql_file_path)
+    try:
+        reader = pd.read_csv(source, delimiter='|', header=None, dtype=column_dtypes(columns), chunksize=chunksize)
+    except pd.errors.EmptyDataError:
+        return
+
+    frames = (transform_frame(chunk, columns, year, tablename) for chunk in reader)
+    if output_format == 'binary':
+        yield from pg_binary_copy.iter_copy_data(frames, dict(columns))
+        return
+    for i, chunk in enumerate(frames):
+        if i == 0:
+            yield '|'.join(chunk.columns) + '\n'
+        yield chunk.to_csv(index=False, sep='|', header=False, float_format=FLOAT_FORMAT)
+
+def transform_frame(df, columns, year, tablename):
+    df = df.iloc[:, :len(columns)]
+    df.columns = [name for name, _ in columns[:len(df.columns)]]
+    convert_numeric_columns(df, columns)
+
+    apply_geocoding(df, 'cand_zip')
+    apply_geocoding(df, 'zip_code', donor=True)
+    print("Table name: ", tablename)
+    if tablename == 'individual_contributions.txt':
+        print("Processing individual contributions")
+        # Normalize and format transaction_dt; donor-level metrics are built in
+        # Postgres afterwards (postprocess_data.build_donor_summary)
+        df['formatted_transaction_dt'] = parse_fec_dates(df['transaction_dt'])
+
+    df['file_year'] = year
+    return df
+
+def convert_numeric_columns(df, columns):
+    """
+    Convert the numeric columns of a frame read as text (see column_dtypes) to
+    their dtypes, and check that numeric IDENTIFIER_COLUMNS, which stay text,
+    hold numbers. A value that doesn't parse, e.g. a stray letter or a shifted
+    field, becomes NULL with a warning rather than failing the whole file.
+    """
+    for name, column_type in columns:
+        if name not in df.columns:
+            continue
+        values = df[name]
+        dtype = column_dtype(name, column_type)
+        if dtype in NUMERIC_DTYPES:
+            numbers = pd.to_numeric(values, errors='coerce')
+            if dtype == 'Int64':
+                numbers = numbers.where(numbers % 1 == 0)
+            malformed = values.notna() & numbers.isna()
+            converted = numbers.astype(dtype)
+        elif name in IDENTIFIER_COLUMNS and column_type in INTEGER_TYPES + DECIMAL_TYPES:
+            number = r'\s*[+-]?\d+\s*' if column_type in INTEGER_TYPES else r'\s*[+-]?(?:\d+\.?\d*|\.\d+)\s*'
+            malformed = values.notna() & ~values.fillna('0').str.fullmatch(number)
+            converted = values.where(~malformed)
+        else:
+            continue
+        if malformed.any():
+            print(f"Warning: {malformed.sum()} malformed {name} values set to NULL, "
+                  f"e.g. {values[malformed].iloc[0]!r}")
+        df[name] = converted
 
-def geocode(zip_code, cache, nomi, lat=True):
-    if zip_code not in cache:
-        result = nomi.query_postal_code(str(zip_code)[:5])
-        cache[zip_code] = (result.latitude if pd.notnull(result.latitude) else 0.0, result.longitude if pd.notnull(result.longitude) else 0.0)
-    print("zipcode: ", zip_code)
-    return cache[zip_code][0 if lat else 1]
+def apply_geocoding(df, column_name, donor=False):
+    """
+    Add latitude/longitude columns for the ZIP codes in column_name, looked up in
+    the shared on-disk ZIP centroid table. Unknown ZIPs get 0.0.
+    """
+    if column_name in df.columns:
+        latitudes, longitudes = geocode_zip_codes(df[column_name])
+        df[f'{"donor_" if donor else "candidate_"}latitude'] = latitudes
+        df[f'{"donor_" if donor else "candidate_"}longitude'] = longitudes
 
 def extract_column_names_from_sql(sql_file_path):
-    column_names = []
+    return [name for name, _ in extract_columns_from_sql(sql_file_path)]
+
+def extract_columns_from_sql(sql_file_path):
+    """
+    Return (name, type) pairs for the lines of the first CREATE TABLE in
+    sql_file_path, with the type lowercased and without its modifiers, e.g.
+    ('memo_text', 'varchar') for "memo_text varchar (100),".
+    """
+    columns = []
     with open(sql_file_path, 'r') as file:
         in_create_table_block = False
         for line in file:
             if line.strip().lower().startswith("create table"):
                 in_create_table_block = True
-            elif in_create_table_block and line.strip().startswith(");"):
+            elif in_create_table_block and line.strip().startswith(")"):
                 in_create_table_block = False
                 break
             elif in_create_table_block:
+                words = line.split("--")[0].split()
                 column_name = line.strip().split(" ")[0].replace("`", "").replace(",", "")
-                column_names.append(column_name)
-    return column_names
+                column_type = words[1].lower().split("(")[0].rstrip(",") if len(words) > 1 else ""
+                columns.append((column_name, column_type))
+    return columns
+
+def column_dtype(column_name, column_type):
+    """The pandas dtype a raw column ends up as, given its name and SQL type."""
+    if column_name in CATEGORICAL_COLUMNS:
+        return 'category'
+    if column_name in IDENTIFIER_COLUMNS:
+        return str
+    if column_type in DECIMAL_TYPES:
+        return 'float64'
+    if column_type in INTEGER_TYPES:
+        return 'Int64'
+    # Text, including ZIP codes and MMDDYYYY dates, which would lose leading zeros as numbers
+    return str
+
+def column_dtypes(columns):
+    """
+    Map each column position of a raw file to the dtype it is read as, for
+    pd.read_csv(header=None). Numeric columns are read as text and converted
+    by convert_numeric_columns, so one malformed value can't abort the read.
+    """
+    dtypes = {}
+    for position, (name, column_type) in enumerate(columns):
+        dtype = column_dtype(name, column_type)
+        dtypes[position] = str if dtype in NUMERIC_DTYPES else dtype
+    return dtypes
+
+def extract_primary_key_from_sql(sql_file_path):
+    """
+    Return the primary key columns of the first table in sql_file_path, from
+    either a PRIMARY KEY (...) clause or an inline "col TYPE PRIMARY KEY".
+    Returns an empty list if the table has no primary key.
+    """
+    with open(sql_file_path, 'r') as file:
+        in_create_table_block = False
+        for line in file:
+            definition = line.split("--")[0].strip()
+            if definition.lower().startswith("create table"):
+                in_create_table_block = True
+            elif in_create_table_block and definition.startswith(")"):
+                break
+            elif in_create_table_block and definition.upper().startswith("PRIMARY KEY"):
+                columns = definition[definition.index("(") + 1:definition.rindex(")")]
+                return [column.strip() for column in columns.split(",")]
+            elif in_create_table_block and "PRIMARY KEY" in definition.upper():
+                return [definition.split(" ")[0]]
+    return []
 
-def preprocess_directory(data_directory, sql_directory, year):
+def preprocess_directory(data_directory, sql_directory, year, chunksize=None, engine='pandas', output_format='csv'):
     for item in os.listdir(data_directory):
         data_full_path = os.path.join(data_directory, item)
         if os.path.isdir(data_full_path):
-            preprocess_directory(data_full_path, sql_directory, year)
+            preprocess_directory(data_full_path, sql_directory, year, chunksize, engine, output_format)
         elif item.endswith(".txt"):
             print(f"Item {item }")
             sql_file_name = os.path.splitext(item)[0] + ".sql"
             sql_full_path = os.path.join(sql_directory, sql_file_name)
             print(f"Processing {data_full_path} for year {year}")
-            preprocess_file(data_full_path, sql_full_path, year, item)
+            preprocess_file(data_full_path, sql_full_path, year, item, chunksize=chunksize, engine=engine,
+                            output_format=output_format)
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 4:
-        print(f"Usage: python script.py {sys.argv[1:4]}")
-        sys.exit(1)
-    
-    data_directory, sql_directory, year = sys.argv[1:4]
-    preprocess_directory(data_directory, sql_directory, year)
+    import argparse
+    parser = argparse.ArgumentParser(description="Preprocess FEC bulk files for loading into Postgres.")
+    parser.add_argument("data_directory")
+    parser.add_argument("sql_directory")
+    parser.add_argument("year")
+    parser.add_argument("--chunksize", type=int, default=int(os.environ.get("PREPROCESS_CHUNKSIZE", 0)) or None,
+                        help="Stream each file in chunks of this many rows instead of loading it whole "
+                             "(default: $PREPROCESS_CHUNKSIZE, unset means no chunking)")
+    parser.add_argument("--engine", choices=ENGINES, default=os.environ.get("PREPROCESS_ENGINE", "pandas"),
+                        help="CSV reader/writer; 'arrow' needs pyarrow (default: $PREPROCESS_ENGINE or pandas)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", dest="output_format",
+                        help="Write pipe-delimited text, or PostgreSQL binary COPY data (FORMAT binary)")
+    args = parser.parse_args()
+
+    preprocess_directory(args.data_directory, args.sql_directory, args.year, args.chunksize, args.engine,
+                         args.output_format)
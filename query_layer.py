@@ -0,0 +1,153 @@
+"""
+Precomputed, indexed query layer behind the backend's aggregate endpoints.
+
+The raw tables only get primary keys from sql/*.sql. This module owns the
+secondary indexes the API's joins and filters need, and the materialized views
+that replace per-request GROUP BYs. The loader calls refresh_query_layer()
+after each year is loaded; views are refreshed CONCURRENTLY once populated, so
+the API keeps reading the previous contents while a refresh runs, and the
+data_version stamp is bumped afterwards so the backend's response cache rolls
+over to the new data.
+"""
+import psycopg2
+
+# Extensions the indexes below depend on (pg_trgm is a trusted extension, so
+# the database owner can create it)
+EXTENSIONS = ['pg_trgm']
+
+# Indexes that need an extension; they are skipped if it can't be created
+INDEX_EXTENSIONS = {'candidate_master_cand_name_trgm_idx': 'pg_trgm'}
+
+# (index name, table, index definition)
+INDEXES = [
+    ('individual_contributions_cmte_id_idx', 'individual_contributions', '(cmte_id, file_year)'),
+    ('individual_contributions_employer_idx', 'individual_contributions', '(employer, file_year)'),
+    ('committee_candidate_contributions_cmte_id_idx', 'committee_candidate_contributions', '(cmte_id, file_year)'),
+    ('committee_candidate_contributions_cand_id_idx', 'committee_candidate_contributions', '(cand_id, file_year)'),
+    ('committee_candidate_contributions_transaction_tp_idx', 'committee_candidate_contributions', '(transaction_tp)'),
+    ('candidate_committee_linkages_cand_id_idx', 'candidate_committee_linkages', '(cand_id)'),
+    ('candidate_committee_linkages_cmte_id_idx', 'candidate_committee_linkages', '(cmte_id)'),
+    ('committee_transactions_cmte_id_idx', 'committee_transactions', '(cmte_id)'),
+    # Serves cand_name ILIKE '%...%' and the trigram operators behind /candidates/search
+    ('candidate_master_cand_name_trgm_idx', 'candidate_master', 'USING gin (cand_name gin_trgm_ops)'),
+]
+
+# name -> (defining query, index statements). Each view needs a unique index
+# for REFRESH ... CONCURRENTLY; the DESC index covers the endpoint's top-N read.
+MATERIALIZED_VIEWS = {
+    'committee_candidate_totals': (
+        """
+        SELECT
+            SUM(ccc.transaction_amt) AS transaction_total,
+            cm.cmte_id,
+            cm.cmte_nm AS committee_name,
+            cm.file_year,
+            ccc.cand_id,
+            cand.cand_name AS candidate_name
+        FROM committee_candidate_contributions ccc
+        JOIN committee_master cm ON cm.cmte_id = ccc.cmte_id AND cm.file_year = ccc.file_year
+        JOIN candidate_master cand ON cand.cand_id = ccc.cand_id AND cand.file_year = ccc.file_year
+        WHERE (ccc.transaction_tp = '24A' OR ccc.transaction_tp = '24N')
+        GROUP BY cm.file_year, ccc.cand_id, cand.cand_name, cm.cmte_id, cm.cmte_nm
+        """,
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS committee_candidate_totals_key ON committee_candidate_totals (file_year, cand_id, cmte_id)",
+            "CREATE INDEX IF NOT EXISTS committee_candidate_totals_total_idx ON committee_candidate_totals (transaction_total DESC) INCLUDE (committee_name, file_year, candidate_name)",
+        ],
+    ),
+    'employer_contribution_counts': (
+        """
+        SELECT employer, file_year, COUNT(*) AS distinct_contributions
+        FROM individual_contributions ci
+        JOIN committee_master cm USING(cmte_id, file_year)
+        GROUP BY employer, file_year
+        """,
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS employer_contribution_counts_key ON employer_contribution_counts (employer, file_year)",
+            "CREATE INDEX IF NOT EXISTS employer_contribution_counts_count_idx ON employer_contribution_counts (distinct_contributions DESC) INCLUDE (employer, file_year)",
+        ],
+    ),
+}
+
+def create_extensions(conn):
+    """
+    Create any missing EXTENSIONS and return the ones available. An extension
+    the server doesn't ship, or the role may not create, is skipped with a
+    warning; only the indexes that need it are left out.
+    """
+    available = []
+    cur = conn.cursor()
+    for extension in EXTENSIONS:
+        try:
+            cur.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}")
+            conn.commit()
+            available.append(extension)
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Warning: could not create extension {extension}, skipping the indexes that need it: {e}")
+    cur.close()
+    return available
+
+def index_statements(extensions=EXTENSIONS):
+    """
+    CREATE INDEX statements for INDEXES, one per index so they can be run in
+    parallel, leaving out those needing an extension not in extensions.
+    """
+    return [f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} {definition}"
+            for index_name, table_name, definition in INDEXES
+            if INDEX_EXTENSIONS.get(index_name) in (None, *extensions)]
+
+def create_query_layer(conn):
+    """Create any missing extensions, indexes and (unpopulated) materialized views."""
+    extensions = create_extensions(conn)
+    cur = conn.cursor()
+    for statement in index_statements(extensions):
+        cur.execute(statement)
+    for view_name, (query, view_index_statements) in MATERIALIZED_VIEWS.items():
+        cur.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view_name} AS {query} WITH NO DATA")
+        for statement in view_index_statements:
+            cur.execute(statement)
+    conn.commit()
+    cur.close()
+
+def refresh_query_layer(conn):
+    """
+    Refresh every materialized view. The first refresh of a view populates it
+    normally; later ones run CONCURRENTLY so readers are never blocked.
+    """
+    create_query_layer(conn)
+    cur = conn.cursor()
+    for view_name in MATERIALIZED_VIEWS:
+        cur.execute("SELECT ispopulated FROM pg_matviews WHERE matviewname = %s", (view_name,))
+        populated = cur.fetchone()[0]
+        print(f"Refreshing materialized view {view_name}...")
+        cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if populated else ''}{view_name}")
+        cur.execute(f"ANALYZE {view_name}")
+        conn.commit()
+    cur.close()
+
+def bump_data_version(conn):
+    """Advance the data_version stamp so the backend's cached responses expire."""
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO data_version (id, version) VALUES (TRUE, 1)
+        ON CONFLICT (id) DO UPDATE SET version = data_version.version + 1, updated_at = now()
+        RETURNING version
+    """)
+    print(f"Data version is now {cur.fetchone()[0]}")
+    conn.commit()
+    cur.close()
+
+def main():
+    # Database connection details
+    db_name = "fec_data"
+    db_user = "postgres"
+    db_password = "climbing"
+
+    conn = psycopg2.connect(dbname=db_name, user=db_user, password=db_password)
+    refresh_query_layer(conn)
+    bump_data_version(conn)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
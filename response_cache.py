@@ -0,0 +1,71 @@
+"""
+In-process LRU + TTL cache for serialized API responses.
+
+Entries are bounded both by count and by total body size. Callers include the
+loader's data_version stamp in the key, so a reload makes every earlier entry
+unreachable without explicit invalidation; those entries then age out through
+LRU eviction or their TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, max_bytes=128 * 1024 * 1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'uncacheable': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                self._stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            with self._lock:
+                self._stats['uncacheable'] += 1
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl_seconds'] = self.ttl
+        return stats
@@ -0,0 +1,9 @@
+
+-- Single-row stamp bumped whenever loaded or derived data changes; the backend
+-- includes it in its response cache keys so cached responses expire on reload.
+
+CREATE TABLE IF NOT EXISTS data_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), -- Always TRUE, keeps the table to one row
+    version BIGINT NOT NULL DEFAULT 0, -- Incremented after each load / postprocess run
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now() -- When version was last bumped
+);
@@ -0,0 +1,18 @@
+
+-- Donor-level rollup of individual_contributions, one row per (name, zip_code).
+-- Built by postprocess_data.build_donor_summary after each load; join it to
+-- individual_contributions USING (name, zip_code).
+
+CREATE TABLE IF NOT EXISTS donor_summary (
+    name TEXT NOT NULL, -- Contributor name, as in individual_contributions
+    zip_code TEXT NOT NULL, -- Contributor ZIP code, as in individual_contributions
+    contribution_count INTEGER, -- Number of contributions
+    total_transaction_amt NUMERIC, -- Sum of transaction_amt
+    average_periodicity NUMERIC, -- Average gap in days between consecutive contributions
+    first_transaction_dt DATE, -- Earliest formatted_transaction_dt
+    last_transaction_dt DATE, -- Latest formatted_transaction_dt
+    transaction_dates DATE[], -- Dates of the contributions that have one, ascending
+    transaction_amounts NUMERIC[], -- Amounts of the same contributions, in transaction_dates order
+    file_years INTEGER[], -- Election cycles the donor appears in
+    PRIMARY KEY (name, zip_code)
+);
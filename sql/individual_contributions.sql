@@ -2,7 +2,10 @@
 -- https://www.fec.gov/campaign-finance-data/contributions-individuals-file-description/
 
 -- Recommended: Play with the data and build indices based on your planned access patterns.
+-- Donor-level metrics (totals, periodicity, date/amount history) live in donor_summary.
 
+-- Partitioned by file_year: the loader builds each cycle as a standalone individual_contributions_<year>
+-- table and attaches it, and replacing a cycle detaches and drops its partition.
 CREATE TABLE IF NOT EXISTS individual_contributions (
     cmte_id TEXT NOT NULL, 
     amndt_ind TEXT, 
@@ -28,11 +31,6 @@ CREATE TABLE IF NOT EXISTS individual_contributions (
     donor_latitude NUMERIC, 
     donor_longitude NUMERIC, 
     formatted_transaction_dt DATE, -- Formatted transaction date
-    periodicity INTEGER, -- Assuming this represents the gaps in days between contributions
-    total_transaction_amt NUMERIC, -- Total amount of transactions
-    average_periodicity NUMERIC, -- Average periodicity in days
-    transaction_dates DATE[], -- Array of transaction dates
-    transaction_amounts NUMERIC[], -- Assuming you want an array of transaction amounts
     file_year INTEGER,
     PRIMARY KEY (sub_id, file_year)
-);
+) PARTITION BY LIST (file_year);
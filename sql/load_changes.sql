@@ -0,0 +1,14 @@
+
+-- Keys touched by loads since postprocess_data last ran. The loader records
+-- them and the incremental postprocess recomputes only these aggregates,
+-- removing each key once its aggregate has been rebuilt.
+
+CREATE TABLE IF NOT EXISTS changed_donors (
+    name TEXT NOT NULL, -- individual_contributions.name of a loaded row
+    zip_code TEXT NOT NULL, -- individual_contributions.zip_code of a loaded row
+    PRIMARY KEY (name, zip_code)
+);
+
+CREATE TABLE IF NOT EXISTS changed_committees (
+    cmte_id TEXT PRIMARY KEY -- cmte_id of a loaded committee_transactions or candidate_committee_linkages row
+);
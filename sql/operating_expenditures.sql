@@ -1,6 +1,8 @@
 
 -- https://www.fec.gov/campaign-finance-data/operating-expenditures-file-description/
 
+-- Partitioned by file_year: the loader builds each cycle as a standalone operating_expenditures_<year>
+-- table and attaches it, and replacing a cycle detaches and drops its partition.
 CREATE TABLE IF NOT EXISTS operating_expenditures (
     cmte_id text, -- CMTE_ID|Filer identification number|1|N|VARCHAR2 (9)|Identification number of committee filing report. A 9-character alpha-numeric code assigned to a committee by the Federal Election Commission|C00100005
     amndt_ind text, -- AMNDT_IND|Amendment indicator|2|Y|VARCHAR2 (1)|Indicates if the report being filed is new (N), an amendment (A) to a previous report, or a termination (T) report.|A
@@ -31,4 +33,4 @@ CREATE TABLE IF NOT EXISTS operating_expenditures (
     donor_latitude numeric, -- Latitude based on zip_code of donors (if applicable)
     donor_longitude numeric, -- Longitude based on zip_code of donors (if applicable)
     file_year INTEGER
-)
+) PARTITION BY LIST (file_year);
@@ -0,0 +1,81 @@
+"""
+Persistent 5-digit ZIP -> (latitude, longitude) lookup table.
+
+The table is built once from pgeocode's offline US dataset and saved as a
+(100000, 2) float64 .npy array indexed by the integer value of the ZIP prefix.
+It is opened memory-mapped, so lookups need no network access and parallel
+preprocessing workers and the backend all share the same pages.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = os.environ.get(
+    'FEC_ZIP_CENTROIDS',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'zip_centroids.npy'),
+)
+
+_tables = {}
+
+def build_zip_centroids(path=DEFAULT_PATH):
+    """
+    Resolve every 5-digit prefix through pgeocode and write the table to path.
+    Prefixes pgeocode doesn't know are stored as NaN.
+    """
+    import pgeocode
+
+    nomi = pgeocode.Nominatim('us')
+    result = nomi.query_postal_code([f'{prefix:05d}' for prefix in range(100000)])
+    table = result[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    # Atomic so concurrent builders and readers never see a partial file
+    os.replace(tmp_path, path)
+    print(f"Wrote ZIP centroid table to {path}")
+    return table
+
+def load_zip_centroids(path=DEFAULT_PATH):
+    """Open the centroid table memory-mapped, building it first if it doesn't exist."""
+    if path not in _tables:
+        if not os.path.exists(path):
+            build_zip_centroids(path)
+        _tables[path] = np.load(path, mmap_mode='r')
+    return _tables[path]
+
+def normalize_zip_prefixes(zip_codes):
+    """
+    Reduce a column of raw ZIP / ZIP+4 values to 5-digit prefixes, or NA.
+
+    Values that went through a numeric dtype lose their leading zeros and gain a
+    ".0" suffix, so those are undone before taking the prefix.
+    """
+    zips = zip_codes.astype('string').str.strip().str.replace(r'\.0+$', '', regex=True)
+    zips = zips.where(zips.str.fullmatch(r'\d{3,9}').fillna(False).astype(bool))
+    lengths = zips.str.len()
+    zips = zips.mask((lengths > 5).fillna(False), zips.str.zfill(9))
+    zips = zips.mask((lengths < 5).fillna(False), zips.str.zfill(5))
+    return zips.str[:5]
+
+def lookup_zip_prefixes(prefixes, path=DEFAULT_PATH):
+    """
+    Return (latitudes, longitudes) arrays for a column of 5-digit prefixes.
+    Missing or unknown prefixes get 0.0.
+    """
+    table = load_zip_centroids(path)
+    index = pd.to_numeric(pd.Series(prefixes, dtype='string'), errors='coerce').fillna(-1).astype(np.int64).to_numpy()
+    known = index >= 0
+    coords = np.zeros((len(index), 2), dtype=np.float64)
+    coords[known] = table[index[known]]
+    coords = np.nan_to_num(coords, nan=0.0)
+    return coords[:, 0], coords[:, 1]
+
+def geocode_zip_codes(zip_codes, path=DEFAULT_PATH):
+    """Return (latitudes, longitudes) arrays for a column of raw ZIP codes."""
+    return lookup_zip_prefixes(normalize_zip_prefixes(pd.Series(zip_codes, dtype=object)), path)
+
+if __name__ == "__main__":
+    import sys
+    build_zip_centroids(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)